@@ -0,0 +1,207 @@
+# benchmark.py
+# Benchmarks layout, initialize_display, update_frame and set_target_shape against the
+# headless NullGUI backend across a sweep of configurations, and writes the results as JSON.
+#
+# Run from the directory containing the unihikerDotMatrix folder:
+#   python -m unihikerDotMatrix.benchmark --output results.json
+#   python -m unihikerDotMatrix.benchmark --quick --compare results.json   # flags regressions
+import argparse
+import datetime
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from unihikerDotMatrix.unihikerDotMatrix import DotMatrixDisplay, NullGUI, np, _LAYOUT_CACHE # Import the library classes
+
+# --- Sweep Definition ---
+# Each layout entry keeps super_dot_offset proportional to dot_size so the 2x2 dots don't overlap.
+LAYOUTS = [
+    {"dot_size": 12, "dot_spacing": 6, "block_size": 6, "block_gap_dots": 2, "super_dot_offset": 8},
+    {"dot_size": 6, "dot_spacing": 3, "block_size": 6, "block_gap_dots": 2, "super_dot_offset": 4},
+    {"dot_size": 4, "dot_spacing": 2, "block_size": 4, "block_gap_dots": 1, "super_dot_offset": 2},
+    {"dot_size": 2, "dot_spacing": 1, "block_size": 4, "block_gap_dots": 1, "super_dot_offset": 1},
+]
+UPDATE_PERCENTAGES = [(0.25, 0.05), (0.5, 0.2)] # (update_percentage_high, update_percentage_low)
+SCREENS = [(240, 320), (320, 240), (480, 800)]
+QUICK_LAYOUTS = LAYOUTS[:2]
+QUICK_SCREENS = SCREENS[:1]
+
+SHAPES = ["circle", "cross", "double_hollow_square", "none"]
+
+
+def _median_time(func, repeats):
+    """Runs func() repeats times and returns the median duration in seconds."""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def _allocations(func):
+    """Returns (allocated_bytes, allocation_blocks) still alive or peaked while running func()."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return peak, blocks
+
+
+def _draw_calls(gui):
+    return sum(gui.calls.values())
+
+
+def _make_display(config, screen):
+    gui = NullGUI(*screen)
+    display = DotMatrixDisplay(config=dict(config, screen_width=screen[0], screen_height=screen[1]), gui=gui)
+    return display, gui
+
+
+def _uncached_layout(display):
+    _LAYOUT_CACHE.clear() # Time the full layout pass, not a cache hit
+    display._calculate_layout_and_create_objects()
+
+
+def run_case(config, screen, frames, repeats):
+    """Benchmarks one configuration and returns a result dict."""
+    display, gui = _make_display(config, screen)
+    result = {
+        "config": {key: config[key] for key in sorted(config) if key not in ("shapes", "seed")},
+        "screen": list(screen),
+        "blocks": len(display.blocks),
+        "dots": display.num_total_dots,
+    }
+
+    # --- Layout ---
+    result["layout_s"] = _median_time(lambda: _uncached_layout(display), repeats)
+    result["layout_cached_s"] = _median_time(display._calculate_layout_and_create_objects, repeats)
+    result["layout_peak_bytes"], result["layout_alloc_blocks"] = _allocations(lambda: _uncached_layout(display))
+
+    # --- initialize_display ---
+    gui.reset_counts()
+    display.initialize_display()
+    result["initialize_draw_calls"] = _draw_calls(gui)
+    result["initialize_s"] = _median_time(display.initialize_display, repeats)
+
+    # --- set_target_shape ---
+    shape_cycle = itertools.cycle(SHAPES)
+    gui.reset_counts()
+    switches = max(repeats, len(SHAPES))
+    durations = []
+    for _ in range(switches):
+        start = time.perf_counter()
+        display.set_target_shape(next(shape_cycle))
+        durations.append(time.perf_counter() - start)
+    result["set_target_shape_s"] = statistics.median(durations)
+    result["set_target_shape_draw_calls"] = _draw_calls(gui) / switches
+
+    # --- update_frame ---
+    display.set_target_shape("circle")
+    gui.reset_counts()
+    durations = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        display.update_frame()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    result["update_frame_mean_s"] = statistics.fmean(durations)
+    result["update_frame_p95_s"] = durations[int(0.95 * (len(durations) - 1))]
+    result["update_frame_draw_calls"] = _draw_calls(gui) / frames
+    alloc_frames = max(1, frames // 10)
+    peak, blocks = _allocations(lambda: [display.update_frame() for _ in range(alloc_frames)])
+    result["update_frame_peak_bytes"] = peak
+    result["update_frame_alloc_blocks"] = blocks / alloc_frames
+    return result
+
+
+def iter_cases(quick=False, seed=0):
+    """Yields (config, screen) pairs for the sweep."""
+    layouts = QUICK_LAYOUTS if quick else LAYOUTS
+    screens = QUICK_SCREENS if quick else SCREENS
+    for layout, (high, low), screen in itertools.product(layouts, UPDATE_PERCENTAGES, screens):
+        config = dict(layout, update_percentage_high=high, update_percentage_low=low,
+                      backend='null', collect_stats=False, seed=seed)
+        yield config, screen
+
+
+def _case_key(result):
+    return json.dumps([result["config"], result["screen"]], sort_keys=True)
+
+
+def compare(results, baseline, threshold):
+    """Prints timing ratios against a baseline file and returns the number of regressions."""
+    baseline_cases = {_case_key(case): case for case in baseline["results"]}
+    metrics = ["layout_s", "initialize_s", "set_target_shape_s", "update_frame_mean_s"]
+    regressions = 0
+    for case in results:
+        old = baseline_cases.get(_case_key(case))
+        if old is None:
+            continue
+        for metric in metrics:
+            if not old.get(metric):
+                continue
+            ratio = case[metric] / old[metric]
+            if ratio > threshold:
+                regressions += 1
+                print(f"REGRESSION {metric} x{ratio:.2f} ({old[metric] * 1000:.3f} -> {case[metric] * 1000:.3f} ms) "
+                      f"dots={case['dots']} screen={case['screen']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DotMatrixDisplay on the headless NullGUI backend.")
+    parser.add_argument("--output", "-o", default="bench_results.json", help="JSON file to write (default: %(default)s)")
+    parser.add_argument("--frames", type=int, default=500, help="update_frame calls per case (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=5, help="repeats for layout/initialize timings (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="run a reduced sweep")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for every display (default: %(default)s)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a previous results file")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for config, screen in iter_cases(args.quick, args.seed):
+        result = run_case(config, screen, args.frames, args.repeats)
+        results.append(result)
+        print(f"dots={result['dots']:6d} screen={screen[0]}x{screen[1]} "
+              f"pct={config['update_percentage_high']}/{config['update_percentage_low']} | "
+              f"layout {result['layout_s'] * 1000:.2f} ms (cached {result['layout_cached_s'] * 1000:.2f}) | init {result['initialize_s'] * 1000:.2f} ms | "
+              f"shape {result['set_target_shape_s'] * 1000:.3f} ms | "
+              f"frame {result['update_frame_mean_s'] * 1000:.3f} ms ({result['update_frame_draw_calls']:.0f} calls)",
+              flush=True)
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__ if np is not None else None,
+        "frames": args.frames,
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"{regressions} regression(s) above x{args.threshold}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,7 @@
 # main_thread_program.py
-import time
 import sys
 import threading # Import the threading module
-from unihikerDotMatrix.unihikerDotMatrix import DotMatrixDisplay # Import the library class
+from unihikerDotMatrix.unihikerDotMatrix import DotMatrixDisplay, FrameScheduler # Import the library classes
 
 # --- Configuration for this example ---
 # (Keep shape definitions accessible if needed, but they are primarily used by the library)
@@ -26,25 +25,20 @@ def animation_worker(display_instance):
     This function runs in a separate thread and continuously updates the display.
     """
     print("[Animation Thread] Started.")
-    last_update_time = time.monotonic()
     frame_counter = 0 # Local frame counter for the thread if needed
 
-    while not stop_animation_flag.is_set():
-        current_monotonic_time = time.monotonic()
+    # --- Frame Pacing ---
+    # The scheduler sleeps until each absolute deadline (no busy polling, no drift)
+    # and wakes up immediately when the stop flag is set.
+    scheduler = FrameScheduler(display_instance.config["animation_interval"],
+                               policy=display_instance.config["frame_policy"],
+                               stop_event=stop_animation_flag)
 
-        # --- Frame Update Logic (Non-Blocking) ---
-        if current_monotonic_time - last_update_time >= display_instance.config["animation_interval"]:
-            display_instance.update_frame() # Update one frame
-            frame_counter += 1
-            last_update_time = current_monotonic_time # Reset the update timer
-        # ---
+    while scheduler.wait():
+        display_instance.update_frame() # Update one frame
+        frame_counter += 1
 
-        # --- Small sleep to yield CPU ---
-        # Prevents the thread from consuming 100% CPU if interval is very small
-        # or update_frame is very fast.
-        time.sleep(0.001)
-
-    print("[Animation Thread] Stopped.")
+    print(f"[Animation Thread] Stopped. Missed deadlines: {scheduler.missed_deadlines}")
 
 
 # --- Main Program ---
@@ -95,7 +89,8 @@ if __name__ == "__main__":
                 break # Exit the input loop
 
             # Validate input and set shape in the display object
-            # The animation thread will pick up the change on its next update checks
+            # set_target_shape is thread-safe: the change is published here and applied
+            # (and drawn) by the animation thread at the start of its next frame
             if user_input in display.config['shapes']:
                 display.set_target_shape(user_input)
             else:
@@ -1,9 +1,32 @@
 # Import the necessary library components
-from unihiker import GUI
 import time
 import random # Import the random module
 import sys # Import sys for flushing output
 import datetime # Import datetime for timestamp
+import collections # For the rolling frame-time window
+import threading # For publishing shape changes to the render thread
+import asyncio # For the event-loop driven run_async
+from array import array # Compact columns for the dot store
+import struct # For writing PNG chunks
+import zlib # For PNG compression
+import os # For the on-disk layout cache
+import hashlib # For layout cache file names
+import itertools # For decoding delta-encoded recordings
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional; the pure-Python frame engine is used without it
+    np = None
+
+try:
+    from PIL import Image
+except ImportError: # PIL is only needed to push composited frames to the UniHiker GUI
+    Image = None
+
+try:
+    from unihiker import GUI
+except ImportError: # Allows the headless backends to run on machines without the UniHiker library
+    GUI = None
 
 # --- Default Configuration (can be overridden during instantiation) ---
 DEFAULT_CONFIG = {
@@ -14,31 +37,38 @@ DEFAULT_CONFIG = {
     "block_gap_dots": 2,   # Number of original dot positions to skip between blocks
     "super_dot_offset": 8, # Offset from block center for placing 2x2 super dots
     "animation_interval": 0.02, # Target interval (in seconds) between frame updates
+    "frame_policy": 'skip', # Late frames: 'skip' missed slots, or 'catch_up' by running them back-to-back
     "update_percentage_high": 0.25, # Percentage of HIGH brightness dots to update each frame
     "update_percentage_low": 0.05,  # Percentage of LOW brightness dots to update each frame
+    "adaptive_update": False, # Scale both update percentages each frame to hold the frame-time budget
+    "adaptive_frame_budget": 0.8, # Target update_frame duration as a fraction of animation_interval
+    "adaptive_scale_min": 0.1, # Lower bound of the update percentage scale
+    "adaptive_scale_max": 2.0, # Upper bound of the update percentage scale (percentages are capped at 100%)
+    "retained_mode": True, # Create one canvas object per dot once and recolor it in place
+    "engine": 'auto',      # Frame generation: 'numpy' (vectorized), 'python', or 'auto' (numpy if installed)
+    "render_mode": 'objects', # 'objects' (one canvas item per dot) or 'composite' (offscreen buffer, image blits)
+    "composite_tile_size": 0, # Tile size in pixels for composite blits; 0 = one full-screen image per frame
 
-    # Shape Definitions (Based on a 5x7 grid)
-    #  0  1  2  3  4
-    #  5  6  7  8  9
-    # 10 11 12 13 14
-    # 15 16 17 18 19
-    # 20 21 22 23 24
-    # 25 26 27 28 29
-    # 30 31 32 33 34
+    # Shape Definitions
+    # Each shape is a resolution-independent bitmap: a tuple of equal-length rows, top to bottom,
+    # where '#' marks a highlighted cell. Bitmaps are scaled onto whatever block grid the layout
+    # produces (the defaults are drawn at 5x7, the grid of the default layout, so they map 1:1).
+    # A shape may also be a callable mask f(u, v) -> bool over block centers in [0, 1] x [0, 1],
+    # or (legacy) a set of block IDs, which is used as-is regardless of the grid.
     "shapes": {
-        "circle": {7, 11, 12, 13, 16, 17, 18, 21, 22, 23, 27},
-        "filled_square": {11, 12, 13, 16, 17, 18, 21, 22, 23},
-        "hollow_square": {11, 12, 13, 16, 18, 21, 22, 23},
-        "cross": {7, 12, 16, 17, 18, 22, 27},
-        "x_shape": {7, 9, 11, 13, 17, 21, 23, 25, 27},
-        "h_shape": {11, 13, 16, 17, 18, 21, 23},
-        "arrow_up": {6, 7, 8, 12, 17, 22, 27},
-        "arrow_down": {7, 12, 17, 22, 26, 27, 28},
-        "horizontal_line": {15, 16, 17, 18, 19},
-        "vertical_line": {2, 7, 12, 17, 22, 27, 32},
-        "hollow_square_left": {21, 22, 23, 26, 28, 31, 32, 33}, # Center 27
-        "hollow_square_right": {1, 2, 3, 6, 8, 11, 12, 13},    # Center 7
-        "double_hollow_square": {1, 2, 3, 6, 8, 11, 12, 13, 21, 22, 23, 26, 28, 31, 32, 33},
+        "circle": (".....", "..#..", ".###.", ".###.", ".###.", "..#..", "....."),
+        "filled_square": (".....", ".....", ".###.", ".###.", ".###.", ".....", "....."),
+        "hollow_square": (".....", ".....", ".###.", ".#.#.", ".###.", ".....", "....."),
+        "cross": (".....", "..#..", "..#..", ".###.", "..#..", "..#..", "....."),
+        "x_shape": (".....", "..#.#", ".#.#.", "..#..", ".#.#.", "#.#..", "....."),
+        "h_shape": (".....", ".....", ".#.#.", ".###.", ".#.#.", ".....", "....."),
+        "arrow_up": (".....", ".###.", "..#..", "..#..", "..#..", "..#..", "....."),
+        "arrow_down": (".....", "..#..", "..#..", "..#..", "..#..", ".###.", "....."),
+        "horizontal_line": (".....", ".....", ".....", "#####", ".....", ".....", "....."),
+        "vertical_line": ("..#..", "..#..", "..#..", "..#..", "..#..", "..#..", "..#.."),
+        "hollow_square_left": (".....", ".....", ".....", ".....", ".###.", ".#.#.", ".###."),
+        "hollow_square_right": (".###.", ".#.#.", ".###.", ".....", ".....", ".....", "....."),
+        "double_hollow_square": (".###.", ".#.#.", ".###.", ".....", ".###.", ".#.#.", ".###."),
         "none": set() # Option for no highlighted shape
     },
 
@@ -47,6 +77,36 @@ DEFAULT_CONFIG = {
     "low_brightness_max": 100,
     "high_brightness_min": 155,
     "high_brightness_max": 255,
+    "seed": None,          # Seed for this display's random generators (None = unpredictable)
+
+    # Color Configuration
+    "dot_color": 'white',  # Color of a dot at full brightness (level 255); levels blend from bg_color
+    "palette": None,       # Optional explicit list of 256 color strings indexed by brightness level
+    "brightness_levels": 256, # Distinct grey steps shown (e.g. 16); coarser steps let more redraws be skipped
+
+    # Text / Marquee Configuration
+    "marquee_step_frames": 4, # Frames between one-column scroll steps of a marquee
+    "marquee_gap": 2,         # Blank columns between repetitions of a looping marquee
+
+    # Sequence Configuration
+    "transition_duration": 0.5, # Default transition length (seconds) for load_sequence steps
+    "fade_frames": 0,         # Frames over which dots ease into their new brightness range when a block's
+                              # highlight changes (0 = switch at once; high dots then brighten via random updates)
+
+    # Screen Geometry
+    "screen_width": 240,      # Physical screen (or panel) width in pixels
+    "screen_height": 320,     # Physical screen (or panel) height in pixels
+    "rotation": 0,            # Clockwise rotation of the matrix on the screen: 0, 90, 180 or 270 (90/270 = landscape)
+    "layout_cache_dir": None, # Optional directory where computed layouts are stored and reused across runs
+    "viewport": None,         # Optional (x, y, width, height) area of the screen this display owns (None = whole screen)
+
+    # Rendering Backend: 'unihiker' (device screen), 'framebuffer' (offscreen RGB buffer) or 'null' (counts calls)
+    "backend": 'unihiker',
+
+    # Instrumentation
+    "collect_stats": True,      # Record per-frame timings, draw calls and errors (see get_stats())
+    "stats_window": 300,        # Number of recent frames kept for percentiles and FPS
+    "stats_log_interval": 0,    # Seconds between stats log lines printed by update_frame (0 = never)
 
     # ID Display Configuration
     "show_ids": False,
@@ -54,27 +114,1050 @@ DEFAULT_CONFIG = {
     "id_font_size": 10,
 }
 
+# --- Color Helpers (Internal) ---
+
+_NAMED_COLORS = {
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "gray": (128, 128, 128),
+    "grey": (128, 128, 128),
+    "red": (255, 0, 0),
+    "lime": (0, 255, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255),
+    "orange": (255, 165, 0),
+    "purple": (128, 0, 128),
+}
+
+def _tk_color(color):
+    """Resolves a color through the running Tk interpreter (e.g. the UniHiker GUI's). Returns None if that fails."""
+    tkinter = sys.modules.get("tkinter") # Only used when a GUI has already loaded it
+    root = getattr(tkinter, "_default_root", None)
+    if root is None:
+        return None
+    try:
+        r, g, b = root.winfo_rgb(color)
+    except Exception:
+        return None
+    return (r >> 8, g >> 8, b >> 8)
+
+def _parse_color(color):
+    """
+    Converts a color name, '#rrggbb' string or (r, g, b) tuple into an (r, g, b) tuple.
+
+    Names outside the built-in table are resolved through Tk when a Tk GUI is running.
+
+    Raises:
+        ValueError: If the color cannot be resolved.
+    """
+    if isinstance(color, (tuple, list)):
+        return tuple(int(c) for c in color[:3])
+    value = str(color).strip().lower()
+    if value in _NAMED_COLORS:
+        return _NAMED_COLORS[value]
+    if value.startswith('#') and len(value) == 7:
+        return (int(value[1:3], 16), int(value[3:5], 16), int(value[5:7], 16))
+    if value.startswith('#') and len(value) == 4:
+        return tuple(int(c * 2, 16) for c in value[1:4])
+    rgb = _tk_color(value)
+    if rgb is not None:
+        return rgb
+    raise ValueError(f"Unsupported color: {color!r}")
+
+_COLOR_BYTES_CACHE = {}
+
+def _color_bytes(color):
+    """Returns the 3-byte RGB encoding of a color, cached for the (interned) palette strings."""
+    try:
+        return _COLOR_BYTES_CACHE[color]
+    except (KeyError, TypeError):
+        try:
+            rgb = bytes(_parse_color(color))
+        except ValueError:
+            # Headless backends without Tk only know the built-in names: draw unknown ones black
+            print(f"Warning: Color {color!r} cannot be resolved here; using black.", file=sys.stderr, flush=True)
+            rgb = b'\x00\x00\x00'
+        if isinstance(color, str):
+            _COLOR_BYTES_CACHE[color] = rgb
+        return rgb
+
+def _build_palette(bg_color='black', dot_color='white'):
+    """
+    Builds the 256-entry color table indexed by brightness level.
+
+    Level 0 is bg_color, level 255 is dot_color and the levels in between blend linearly.
+    With the default black/white pair this yields the classic '#llllll' grey ramp.
+    """
+    bg = _parse_color(bg_color)
+    fg = _parse_color(dot_color)
+    palette = []
+    for level in range(256):
+        r, g, b = (bg[c] + ((fg[c] - bg[c]) * level + 127) // 255 for c in range(3))
+        palette.append(sys.intern(f'#{r:02x}{g:02x}{b:02x}'))
+    return palette
+
+_GREY_PALETTE = _build_palette()
+
+# --- Rendering Backends ---
+# Every backend exposes the subset of the UniHiker GUI API used by this library:
+# draw_rect / draw_text / draw_image return an object with config(**kwargs), and remove(obj).
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _png_chunk(tag, data):
+    """Packs one PNG chunk (length, tag, data, CRC)."""
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+def _png_scanlines(pixels, width, height):
+    """Returns RGB pixels as unfiltered PNG scanlines (a 0 filter byte before each row)."""
+    stride = width * 3
+    return b''.join(b'\x00' + bytes(pixels[y * stride:(y + 1) * stride]) for y in range(height))
+
+class Framebuffer:
+    """A width x height RGB image stored row-major in a bytearray (3 bytes per pixel)."""
+    def __init__(self, width, height, color='black'):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(_color_bytes(color) * (width * height))
+
+    def fill_rect(self, x, y, w, h, color):
+        """Fills a rectangle (clipped to the buffer) with a color."""
+        x0, y0 = max(0, int(x)), max(0, int(y))
+        x1, y1 = min(self.width, int(x + w)), min(self.height, int(y + h))
+        if x1 <= x0 or y1 <= y0:
+            return
+        row = _color_bytes(color) * (x1 - x0)
+        stride = self.width * 3
+        start = y0 * stride + x0 * 3
+        for _ in range(y1 - y0):
+            self.pixels[start:start + len(row)] = row
+            start += stride
+
+    def region_bytes(self, x, y, w, h):
+        """Returns the packed RGB bytes of a rectangle (which must lie inside the buffer)."""
+        stride = self.width * 3
+        if x == 0 and w == self.width:
+            return bytes(self.pixels[y * stride:(y + h) * stride])
+        return b''.join(self.pixels[(y + r) * stride + x * 3:(y + r) * stride + (x + w) * 3] for r in range(h))
+
+    def get_pixel(self, x, y):
+        """Returns the (r, g, b) tuple at a pixel."""
+        i = (y * self.width + x) * 3
+        return tuple(self.pixels[i:i + 3])
+
+    def as_array(self):
+        """Returns a (height, width, 3) uint8 NumPy view of the pixels (requires NumPy)."""
+        if np is None:
+            raise ImportError("NumPy is required for Framebuffer.as_array()")
+        return np.frombuffer(self.pixels, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def to_png_bytes(self):
+        """Encodes the buffer as a PNG file (pure Python)."""
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)
+        data = zlib.compress(_png_scanlines(self.pixels, self.width, self.height))
+        return _PNG_SIGNATURE + _png_chunk(b'IHDR', header) + _png_chunk(b'IDAT', data) + _png_chunk(b'IEND', b'')
+
+    def save_png(self, path):
+        """Writes the buffer to a PNG file, e.g. for golden-image tests."""
+        with open(path, 'wb') as f:
+            f.write(self.to_png_bytes())
+
+class _BackendItem:
+    """A canvas object returned by the headless backends; config() updates it in place."""
+    def __init__(self, gui, kind, **kwargs):
+        self.gui = gui
+        self.kind = kind
+        self.options = kwargs
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+        self.gui._on_config(self)
+
+class NullGUI:
+    """Backend that draws nothing and only counts calls (for profiling layout and animation logic)."""
+    supports_raw_images = True # draw_image accepts (width, height, rgb_bytes) tuples
+
+    def __init__(self, width=240, height=320):
+        self.width = width
+        self.height = height
+        self.calls = {"draw_rect": 0, "draw_text": 0, "draw_image": 0, "config": 0, "remove": 0}
+
+    def reset_counts(self):
+        """Zeroes all call counters."""
+        for name in self.calls:
+            self.calls[name] = 0
+
+    def _on_config(self, item):
+        self.calls["config"] += 1
+
+    def draw_rect(self, x, y, w, h, fill=None, outline=None, **kwargs):
+        self.calls["draw_rect"] += 1
+        return _BackendItem(self, 'rect', x=x, y=y, w=w, h=h, fill=fill, outline=outline, **kwargs)
+
+    def draw_text(self, x, y, text, **kwargs):
+        self.calls["draw_text"] += 1
+        return _BackendItem(self, 'text', x=x, y=y, text=text, **kwargs)
+
+    def draw_image(self, x, y, image=None, **kwargs):
+        self.calls["draw_image"] += 1
+        return _BackendItem(self, 'image', x=x, y=y, image=image, **kwargs)
+
+    def remove(self, item):
+        self.calls["remove"] += 1
+
+class FramebufferGUI(NullGUI):
+    """
+    Offscreen backend that rasterizes rectangles into a Framebuffer.
+
+    Text is counted but not rasterized. Images may be PIL images or (width, height, rgb_bytes) tuples.
+    """
+    def __init__(self, width=240, height=320):
+        super().__init__(width, height)
+        self.framebuffer = Framebuffer(width, height)
+
+    def _paint(self, item):
+        opts = item.options
+        if item.kind == 'rect':
+            color = opts.get("fill") or opts.get("outline")
+            if color is not None:
+                self.framebuffer.fill_rect(opts["x"], opts["y"], opts["w"], opts["h"], color)
+        elif item.kind == 'image' and opts.get("image") is not None:
+            self._blit(opts["x"], opts["y"], opts["image"])
+
+    def _blit(self, x, y, image):
+        if isinstance(image, tuple):
+            w, h, data = image
+        else: # PIL image
+            w, h = image.size
+            data = image.convert('RGB').tobytes()
+        fb = self.framebuffer
+        x, y = int(x), int(y)
+        rows = min(h, fb.height - y)
+        cols = min(w, fb.width - x)
+        if rows <= 0 or cols <= 0 or x < 0 or y < 0:
+            return
+        stride = fb.width * 3
+        for r in range(rows):
+            src = r * w * 3
+            dst = (y + r) * stride + x * 3
+            fb.pixels[dst:dst + cols * 3] = data[src:src + cols * 3]
+
+    def _on_config(self, item):
+        super()._on_config(item)
+        self._paint(item)
+
+    def draw_rect(self, x, y, w, h, fill=None, outline=None, **kwargs):
+        item = super().draw_rect(x, y, w, h, fill=fill, outline=outline, **kwargs)
+        self._paint(item)
+        return item
+
+    def draw_image(self, x, y, image=None, **kwargs):
+        item = super().draw_image(x, y, image=image, **kwargs)
+        self._paint(item)
+        return item
+
+    def save_png(self, path):
+        """Writes the current frame to a PNG file."""
+        self.framebuffer.save_png(path)
+
+class CompositorGUI(FramebufferGUI):
+    """
+    Wraps a GUI and composites all rectangle drawing into an offscreen framebuffer.
+
+    Rectangles only touch memory; flush() pushes the dirty tiles to the wrapped GUI as
+    images, each through one persistent image object. Text is passed straight through
+    so it stays above the composited image: flush() reports the image objects it had to
+    create (created_images), and the display re-raises its labels above them. With an origin, the composited area is
+    placed at (x, y) on the wrapped GUI (used for viewports).
+    """
+    def __init__(self, target, width=240, height=320, tile_size=0, origin=(0, 0)):
+        super().__init__(width, height)
+        self.target = target
+        self.origin_x, self.origin_y = origin
+        tile_w = tile_size or width
+        tile_h = tile_size or height
+        self._tiles = [(x, y, min(tile_w, width - x), min(tile_h, height - y))
+                       for y in range(0, height, tile_h) for x in range(0, width, tile_w)]
+        self._tiles_per_row = (width + tile_w - 1) // tile_w
+        self._tile_w = tile_w
+        self._tile_h = tile_h
+        self._tile_handles = [None] * len(self._tiles)
+        self._dirty = set(range(len(self._tiles)))
+        self.created_images = 0 # Tile image objects created by the last flush (stacked above existing text)
+
+    def _paint(self, item):
+        super()._paint(item)
+        opts = item.options
+        if item.kind == 'rect':
+            x, y, w, h = opts["x"], opts["y"], opts["w"], opts["h"]
+        elif item.kind == 'image':
+            x, y = opts["x"], opts["y"]
+            image = opts.get("image")
+            w, h = image[:2] if isinstance(image, tuple) else image.size
+        else:
+            return
+        x0, y0 = max(0, int(x)) // self._tile_w, max(0, int(y)) // self._tile_h
+        x1 = min(self.width - 1, int(x + w) - 1) // self._tile_w
+        y1 = min(self.height - 1, int(y + h) - 1) // self._tile_h
+        for ty in range(y0, y1 + 1):
+            for tx in range(x0, x1 + 1):
+                self._dirty.add(ty * self._tiles_per_row + tx)
+
+    def _make_image(self, w, h, data):
+        if getattr(self.target, "supports_raw_images", False):
+            return (w, h, data)
+        if Image is None:
+            raise ImportError("PIL is required for render_mode='composite' on this GUI")
+        return Image.frombytes('RGB', (w, h), data)
+
+    def flush(self):
+        """Pushes every dirty tile to the wrapped GUI. Returns the number of blits."""
+        count = 0
+        self.created_images = 0
+        for i in sorted(self._dirty):
+            x, y, w, h = self._tiles[i]
+            image = self._make_image(w, h, self.framebuffer.region_bytes(x, y, w, h))
+            if self._tile_handles[i] is None:
+                self._tile_handles[i] = self.target.draw_image(x=self.origin_x + x, y=self.origin_y + y, image=image)
+                self.created_images += 1
+            else:
+                self._tile_handles[i].config(image=image)
+            count += 1
+        self._dirty.clear()
+        return count
+
+    def draw_text(self, x, y, text, **kwargs):
+        self.calls["draw_text"] += 1
+        return self.target.draw_text(x=self.origin_x + x, y=self.origin_y + y, text=text, **kwargs)
+
+    def remove(self, item):
+        self.calls["remove"] += 1
+        if not (isinstance(item, _BackendItem) and item.gui is self): # Text lives on the target GUI
+            self.target.remove(item)
+
+def create_backend(name, width=240, height=320):
+    """
+    Creates a GUI backend by name: 'unihiker', 'framebuffer' or 'null'.
+
+    Raises:
+        ImportError: If 'unihiker' is requested but the UniHiker library is not installed.
+        ValueError: If the name is unknown.
+    """
+    if name == 'unihiker':
+        if GUI is None:
+            raise ImportError("The 'unihiker' package is not installed")
+        return GUI()
+    if name == 'framebuffer':
+        return FramebufferGUI(width, height)
+    if name == 'null':
+        return NullGUI(width, height)
+    raise ValueError(f"Unknown backend: {name!r}")
+
 # --- Helper Classes (Internal) ---
 
+class _DotStore:
+    """
+    Struct-of-arrays storage for all super dots.
+
+    Each dot is a few bytes spread over typed columns (x, y, group id, current level)
+    plus a slot in the canvas handle list, instead of a full Python object per dot.
+    """
+    def __init__(self, xs=(), ys=(), groups=()):
+        self.x = array('h', xs) # Top-left x coordinates
+        self.y = array('h', ys) # Top-left y coordinates
+        self.group = array('i', groups) # Block ID of each dot
+        self.level = array('B', bytes(len(self.x))) # Brightness level currently displayed
+        self.handles = [None] * len(self.x) # Persistent canvas objects (retained mode)
+
+    def __len__(self):
+        return len(self.x)
+
+    def paint(self, index, gui, size, color):
+        """Paints one dot, recoloring its persistent canvas object in place when it has one."""
+        handle = self.handles[index]
+        if handle is not None:
+            handle.config(fill=color, outline=color)
+        else:
+            gui.draw_rect(x=self.x[index], y=self.y[index], w=size, h=size, fill=color, outline=color)
+
 class _Dot:
-    """Represents a single dot (super dot) on the display."""
-    def __init__(self, x, y, group_id):
-        self.x = x # Top-left x coordinate
-        self.y = y # Top-left y coordinate
-        self.group_id = group_id
+    """A thin view of a single dot (super dot) held in a _DotStore."""
+    __slots__ = ('_store', 'index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self.index = index # Position in the dot store (and in the frame engine arrays)
+
+    @property
+    def x(self):
+        return self._store.x[self.index] # Top-left x coordinate
+
+    @property
+    def y(self):
+        return self._store.y[self.index] # Top-left y coordinate
+
+    @property
+    def group_id(self):
+        return self._store.group[self.index]
+
+    @property
+    def level(self):
+        return self._store.level[self.index]
+
+    @level.setter
+    def level(self, value):
+        self._store.level[self.index] = value
+
+    @property
+    def handle(self):
+        return self._store.handles[self.index]
+
+    @handle.setter
+    def handle(self, value):
+        self._store.handles[self.index] = value
+
+    def paint(self, gui, size, color):
+        """Paints the dot, recoloring its persistent canvas object in place when it has one."""
+        self._store.paint(self.index, gui, size, color)
+
+class _DotSequence:
+    """Read-only sequence of _Dot views over a _DotStore (what DotMatrixDisplay.all_dots exposes)."""
+    __slots__ = ('_store',)
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_Dot(self._store, i) for i in range(*index.indices(len(self._store)))]
+        if index < 0:
+            index += len(self._store)
+        if not 0 <= index < len(self._store):
+            raise IndexError("dot index out of range")
+        return _Dot(self._store, index)
+
+    def __iter__(self):
+        store = self._store
+        return (_Dot(store, i) for i in range(len(store)))
+
+class _DotPartition:
+    """An unordered set of dot indices with O(1) add/remove that can be sampled directly."""
+    def __init__(self, size, indices=()):
+        self.items = array('i', indices) # Sequence handed to random.sample
+        self._pos = array('i', [-1]) * size # Slot of each dot index in items, -1 if absent
+        for slot, index in enumerate(self.items):
+            self._pos[index] = slot
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, index):
+        return self._pos[index] >= 0
+
+    def add(self, index):
+        """Adds a dot index (no-op if already present)."""
+        if self._pos[index] >= 0:
+            return
+        self._pos[index] = len(self.items)
+        self.items.append(index)
+
+    def remove(self, index):
+        """Removes a dot index by swapping the last item into its slot (no-op if absent)."""
+        slot = self._pos[index]
+        if slot < 0:
+            return
+        self._pos[index] = -1
+        last = self.items.pop()
+        if last != index:
+            self.items[slot] = last
+            self._pos[last] = slot
+
+class _NumpyFrameEngine:
+    """
+    Vectorized frame generator.
+
+    Keeps dot coordinates, the highlight mask and current brightness levels in NumPy
+    arrays, and picks each frame's update subset plus new levels from a single RNG draw.
+    """
+    def __init__(self, store, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Zero-copy views of the dot store columns
+        self.x = np.frombuffer(store.x, dtype=np.int16)
+        self.y = np.frombuffer(store.y, dtype=np.int16)
+        self.levels = np.frombuffer(store.level, dtype=np.uint8)
+        self.high_mask = np.zeros(len(store), dtype=bool)
+        self._high_idx = None # Cached index arrays, rebuilt lazily after highlight changes
+        self._low_idx = None
+
+    def set_highlight(self, dot_indices, is_high):
+        """Marks dots (an index list or slice) as belonging to highlighted (or background) blocks."""
+        self.high_mask[dot_indices] = is_high
+        self._high_idx = None
+
+    def _partitions(self):
+        if self._high_idx is None:
+            self._high_idx = np.flatnonzero(self.high_mask)
+            self._low_idx = np.flatnonzero(~self.high_mask)
+        return self._high_idx, self._low_idx
+
+    def select(self, num_high, num_low, config):
+        """
+        Picks num_high highlighted and num_low background dots and draws new levels for them.
+
+        Returns:
+            tuple: (indices, levels) as NumPy arrays.
+        """
+        high_idx, low_idx = self._partitions()
+        keys = self.rng.random((2, len(self.high_mask))) # Row 0: selection keys, row 1: level fractions
+        chosen = []
+        for idx, count in ((high_idx, num_high), (low_idx, num_low)):
+            if count >= len(idx):
+                chosen.append(idx)
+            elif count > 0:
+                chosen.append(idx[np.argpartition(keys[0, idx], count - 1)[:count]])
+        indices = np.concatenate(chosen) if chosen else np.empty(0, dtype=np.intp)
+        high = self.high_mask[indices]
+        lo = np.where(high, config["high_brightness_min"], config["low_brightness_min"])
+        hi = np.where(high, config["high_brightness_max"], config["low_brightness_max"])
+        levels = (lo + keys[1, indices] * (hi - lo + 1)).astype(np.int64)
+        np.minimum(levels, hi, out=levels)
+        return indices, levels
+
+class _BrightnessFader:
+    """
+    Eases dot levels toward new targets over a number of frames.
+
+    Each fading dot keeps its start level, target level and age. step() interpolates all of
+    them at once (vectorized when NumPy is available) and only returns the dots whose palette
+    color actually changed; the others just get their stored level updated.
+    """
+    def __init__(self, store, use_numpy=False):
+        self._store = store
+        self.mask = bytearray(len(store)) # 1 while a dot is fading (excluded from random updates)
+        self.use_numpy = use_numpy
+        if use_numpy:
+            self._mask = np.frombuffer(self.mask, dtype=np.uint8)
+            self._levels = np.frombuffer(store.level, dtype=np.uint8)
+        self.clear()
+
+    def clear(self):
+        """Drops every running fade."""
+        self.mask[:] = bytes(len(self.mask))
+        if self.use_numpy:
+            self._idx = np.empty(0, dtype=np.intp)
+            self._start = np.empty(0, dtype=np.float64)
+            self._target = np.empty(0, dtype=np.float64)
+            self._age = np.empty(0, dtype=np.int32)
+            self._frames = np.empty(0, dtype=np.int32)
+        else:
+            self._fades = {} # Dot index -> [start, target, age, frames]
+
+    def __len__(self):
+        return len(self._idx) if self.use_numpy else len(self._fades)
+
+    def start(self, indices, targets, frames):
+        """Starts fading the dots at indices from their current level to targets over frames frames."""
+        if self.use_numpy:
+            indices = np.asarray(indices, dtype=np.intp)
+            keep = ~np.isin(self._idx, indices) # A restarted fade replaces the running one
+            self._idx = np.concatenate((self._idx[keep], indices))
+            self._start = np.concatenate((self._start[keep], self._levels[indices]))
+            self._target = np.concatenate((self._target[keep], np.asarray(targets, dtype=np.float64)))
+            self._age = np.concatenate((self._age[keep], np.zeros(len(indices), dtype=np.int32)))
+            self._frames = np.concatenate((self._frames[keep], np.full(len(indices), frames, dtype=np.int32)))
+            self._mask[indices] = 1
+        else:
+            levels = self._store.level
+            for index, target in zip(indices, targets):
+                self._fades[index] = [levels[index], target, 0, frames] # Restarts from the shown level
+                self.mask[index] = 1
+
+    def step(self, codes):
+        """
+        Advances every fade by one frame.
+
+        Args:
+            codes: Per-level color codes; levels with equal codes look identical.
+
+        Returns:
+            tuple: (indices, levels) lists of the dots that need repainting.
+        """
+        if self.use_numpy:
+            if not len(self._idx):
+                return [], []
+            self._age += 1
+            new = np.rint(self._start + (self._target - self._start) * (self._age / self._frames)).astype(np.uint8)
+            codes = np.frombuffer(codes, dtype=np.uint8)
+            changed = codes[new] != codes[self._levels[self._idx]]
+            self._levels[self._idx[~changed]] = new[~changed] # Same color: nothing to draw
+            indices, levels = self._idx[changed].tolist(), new[changed].tolist()
+            done = self._age >= self._frames
+            if done.any():
+                self._mask[self._idx[done]] = 0
+                keep = ~done
+                self._idx, self._start, self._target = self._idx[keep], self._start[keep], self._target[keep]
+                self._age, self._frames = self._age[keep], self._frames[keep]
+            return indices, levels
+        indices, levels = [], []
+        current = self._store.level
+        finished = []
+        for index, fade in self._fades.items():
+            start, target, age, frames = fade
+            age += 1
+            fade[2] = age
+            level = round(start + (target - start) * age / frames)
+            if codes[level] != codes[current[index]]:
+                indices.append(index)
+                levels.append(level)
+            else:
+                current[index] = level
+            if age >= frames:
+                finished.append(index)
+        for index in finished:
+            del self._fades[index]
+            self.mask[index] = 0
+        return indices, levels
+
+class _Layout:
+    """
+    Block grid and super-dot coordinates for a screen size and config, computed in closed form.
+
+    Block counts come straight from the available space, and because the screen bounds check
+    is separable per axis, the valid dot columns/rows are computed once per block column/row
+    and combined into flat coordinate arrays in a single pass.
+    """
+    def __init__(self, width, height, config, rotation=0, origin=(0, 0)):
+        if rotation not in (0, 90, 180, 270):
+            raise ValueError(f"Unsupported rotation: {rotation!r}")
+        if rotation in (90, 270):
+            width, height = height, width # Lay out in the rotated (viewer's) frame
+        # --- Calculations for Centering (uses original block_size for layout) ---
+        orig_dot_size = 4 # Need original size for accurate block dimension calc
+        dot_spacing = config["dot_spacing"]
+        block_size = config["block_size"] # Original 6x6 layout
+        super_dot_size = config["dot_size"] # The size for drawing
+        super_dot_offset = config["super_dot_offset"]
+
+        # Calculate the pixel dimension of the original 6x6 block area
+        block_pixel_dimension = (block_size - 1) * dot_spacing + orig_dot_size
+        gap_pixel_size = config["block_gap_dots"] * dot_spacing
+        total_block_step = block_pixel_dimension + gap_pixel_size
+
+        def blocks_along(extent):
+            # n blocks need n * block + (n - 1) * gap <= extent
+            if block_pixel_dimension > extent:
+                return 0
+            return (extent - block_pixel_dimension) // total_block_step + 1
+
+        def axis(extent, count):
+            """Returns (block centers, valid super-dot start coordinates per block) along one axis."""
+            total = count * block_pixel_dimension + max(0, count - 1) * gap_pixel_size
+            first_orig_dot_center = (extent - total) // 2 + orig_dot_size // 2
+            centers = [first_orig_dot_center + k * total_block_step + (block_pixel_dimension - orig_dot_size) / 2
+                       for k in range(count)]
+            starts = []
+            for center in centers:
+                candidates = (int(center - super_dot_offset - super_dot_size // 2),
+                              int(center + super_dot_offset - super_dot_size // 2))
+                starts.append([c for c in candidates if c >= 0 and c + super_dot_size <= extent])
+            return centers, starts
+
+        self.num_blocks_x = blocks_along(width)
+        self.num_blocks_y = blocks_along(height)
+        centers_x, starts_x = axis(width, self.num_blocks_x)
+        centers_y, starts_y = axis(height, self.num_blocks_y)
+
+        self.block_centers = [(int(cx), int(cy)) for cy in centers_y for cx in centers_x]
+        nx = self.num_blocks_x
+        # Dots are ordered block by block (row-major), then top row before bottom row, left before right,
+        # so each block owns a contiguous range of dot indices
+        coords = [(x, y, by * nx + bx)
+                  for by, ys in enumerate(starts_y) for bx, xs in enumerate(starts_x)
+                  for y in ys for x in xs]
+        self.dot_x = array('h', [c[0] for c in coords])
+        self.dot_y = array('h', [c[1] for c in coords])
+        self.dot_group = array('i', [c[2] for c in coords])
+        self.block_dot_counts = [len(xs) * len(ys) for ys in starts_y for xs in starts_x]
+        if rotation:
+            self._rotate(width, height, super_dot_size, rotation)
+        if origin != (0, 0):
+            ox, oy = origin
+            self.dot_x = array('h', [x + ox for x in self.dot_x])
+            self.dot_y = array('h', [y + oy for y in self.dot_y])
+            self.block_centers = [(cx + ox, cy + oy) for cx, cy in self.block_centers]
+
+    def _rotate(self, width, height, size, rotation):
+        """Maps coordinates laid out on a width x height frame onto the physical screen, rotated clockwise."""
+        xs, ys = self.dot_x, self.dot_y
+        if rotation == 90:
+            self.dot_x = array('h', [height - (y + size) for y in ys])
+            self.dot_y = array('h', xs)
+            self.block_centers = [(height - cy, cx) for cx, cy in self.block_centers]
+        elif rotation == 180:
+            self.dot_x = array('h', [width - (x + size) for x in xs])
+            self.dot_y = array('h', [height - (y + size) for y in ys])
+            self.block_centers = [(width - cx, height - cy) for cx, cy in self.block_centers]
+        else: # 270
+            self.dot_x = array('h', ys)
+            self.dot_y = array('h', [width - (x + size) for x in xs])
+            self.block_centers = [(cy, width - cx) for cx, cy in self.block_centers]
+
+    # --- Serialization (used by the on-disk layout cache) ---
+    _MAGIC = b'UDML1'
+
+    def to_bytes(self):
+        """Packs the layout into a compact binary blob."""
+        n_blocks = len(self.block_centers)
+        centers = array('h', [c for center in self.block_centers for c in center])
+        header = struct.pack('<5sHHII', self._MAGIC, self.num_blocks_x, self.num_blocks_y, n_blocks, len(self.dot_x))
+        parts = [header, centers, array('i', self.block_dot_counts), self.dot_x, self.dot_y, self.dot_group]
+        return b''.join(bytes(part) for part in parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Restores a layout written by to_bytes(). Raises ValueError if the blob is not a layout."""
+        header_size = struct.calcsize('<5sHHII')
+        magic, nx, ny, n_blocks, n_dots = struct.unpack_from('<5sHHII', data)
+        if magic != cls._MAGIC:
+            raise ValueError("not a layout cache file")
+        columns = []
+        offset = header_size
+        for typecode, count in (('h', 2 * n_blocks), ('i', n_blocks), ('h', n_dots), ('h', n_dots), ('i', n_dots)):
+            column = array(typecode)
+            end = offset + count * column.itemsize
+            if end > len(data):
+                raise ValueError("truncated layout cache file")
+            column.frombytes(data[offset:end])
+            columns.append(column)
+            offset = end
+        centers, counts, dot_x, dot_y, dot_group = columns
+        layout = cls.__new__(cls)
+        layout.num_blocks_x, layout.num_blocks_y = nx, ny
+        layout.block_centers = list(zip(centers[0::2], centers[1::2]))
+        layout.block_dot_counts = counts.tolist()
+        layout.dot_x, layout.dot_y, layout.dot_group = dot_x, dot_y, dot_group
+        return layout
+
+_LAYOUT_CACHE = {} # Geometry key -> _Layout
+_LAYOUT_CONFIG_KEYS = ("dot_size", "dot_spacing", "block_size", "block_gap_dots", "super_dot_offset")
+
+def _get_layout(width, height, config, rotation=0, origin=(0, 0)):
+    """
+    Returns the _Layout for a screen geometry, computing it only for geometries not seen before.
+
+    Layouts are cached in memory, keyed by the area size, rotation, origin and the geometry-relevant
+    config values, and also in config["layout_cache_dir"] when set, so a new process with a
+    known config skips the layout pass too. Cache I/O problems are reported and ignored.
+    """
+    key = (width, height, rotation, tuple(origin)) + tuple(config[name] for name in _LAYOUT_CONFIG_KEYS)
+    layout = _LAYOUT_CACHE.get(key)
+    if layout is not None:
+        return layout
+    cache_dir = config.get("layout_cache_dir")
+    path = None
+    if cache_dir:
+        digest = hashlib.sha1(repr(key).encode() + sys.byteorder.encode()).hexdigest()[:20]
+        path = os.path.join(cache_dir, f"layout-{digest}.bin")
+        try:
+            with open(path, 'rb') as f:
+                layout = _Layout.from_bytes(f.read())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Warning: Ignoring layout cache file {path}: {e}", file=sys.stderr, flush=True)
+    if layout is None:
+        layout = _Layout(width, height, config, rotation, origin)
+        if path is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(layout.to_bytes())
+                os.replace(tmp_path, path) # Atomic, so concurrent processes never read a partial file
+            except OSError as e:
+                print(f"Warning: Could not write layout cache file {path}: {e}", file=sys.stderr, flush=True)
+    _LAYOUT_CACHE[key] = layout
+    return layout
+
+# --- Shape Rasterization ---
+
+_SHAPE_MASK_CACHE = {} # (shape definition, num_blocks_x, num_blocks_y) -> frozenset of block IDs
+
+def rasterize_shape(shape, num_blocks_x, num_blocks_y):
+    """
+    Converts a shape definition into the set of highlighted block IDs for a block grid.
+
+    Args:
+        shape: A bitmap (sequence of equal-length strings, '#' = on, any other character = off),
+               a callable mask f(u, v) -> bool evaluated at block centers with u, v in [0, 1],
+               or a set of block IDs (returned unchanged).
+        num_blocks_x (int): Blocks per row of the target grid.
+        num_blocks_y (int): Blocks per column of the target grid.
+
+    Returns:
+        frozenset: Block IDs (row-major, as created by the layout) to highlight.
+
+    Results for bitmaps and callables are cached per (shape, grid), so repeated lookups are O(1).
+    """
+    if isinstance(shape, (set, frozenset)):
+        return frozenset(shape)
+    key = (shape, num_blocks_x, num_blocks_y)
+    try:
+        return _SHAPE_MASK_CACHE[key]
+    except KeyError:
+        pass
+    except TypeError: # Unhashable definition (e.g. a list of rows): rasterize without caching
+        key = None
+    ids = set()
+    if callable(shape):
+        for by in range(num_blocks_y):
+            v = (by + 0.5) / num_blocks_y
+            for bx in range(num_blocks_x):
+                if shape((bx + 0.5) / num_blocks_x, v):
+                    ids.add(by * num_blocks_x + bx)
+    else:
+        rows = list(shape)
+        height = len(rows)
+        width = max((len(row) for row in rows), default=0)
+        if height and width:
+            # Nearest-neighbour sampling at block centers; exact 1:1 when the sizes match
+            cols = [(2 * bx + 1) * width // (2 * num_blocks_x) for bx in range(num_blocks_x)]
+            for by in range(num_blocks_y):
+                row = rows[(2 * by + 1) * height // (2 * num_blocks_y)]
+                for bx, col in enumerate(cols):
+                    if col < len(row) and row[col] == '#':
+                        ids.add(by * num_blocks_x + bx)
+    mask = frozenset(ids)
+    if key is not None:
+        _SHAPE_MASK_CACHE[key] = mask
+    return mask
+
+# --- Bitmap Font ---
+# 3x5 glyphs ('#' = on). Lowercase letters are rendered with the uppercase glyphs.
+
+FONT_HEIGHT = 5
+
+_FONT_3X5 = {
+    "A": (".#.", "#.#", "###", "#.#", "#.#"), "B": ("##.", "#.#", "##.", "#.#", "##."),
+    "C": (".##", "#..", "#..", "#..", ".##"), "D": ("##.", "#.#", "#.#", "#.#", "##."),
+    "E": ("###", "#..", "##.", "#..", "###"), "F": ("###", "#..", "##.", "#..", "#.."),
+    "G": (".##", "#..", "#.#", "#.#", ".##"), "H": ("#.#", "#.#", "###", "#.#", "#.#"),
+    "I": ("###", ".#.", ".#.", ".#.", "###"), "J": ("..#", "..#", "..#", "#.#", ".#."),
+    "K": ("#.#", "#.#", "##.", "#.#", "#.#"), "L": ("#..", "#..", "#..", "#..", "###"),
+    "M": ("#.#", "###", "###", "#.#", "#.#"), "N": ("##.", "#.#", "#.#", "#.#", "#.#"),
+    "O": (".#.", "#.#", "#.#", "#.#", ".#."), "P": ("##.", "#.#", "##.", "#..", "#.."),
+    "Q": (".#.", "#.#", "#.#", "##.", ".##"), "R": ("##.", "#.#", "##.", "#.#", "#.#"),
+    "S": (".##", "#..", ".#.", "..#", "##."), "T": ("###", ".#.", ".#.", ".#.", ".#."),
+    "U": ("#.#", "#.#", "#.#", "#.#", "###"), "V": ("#.#", "#.#", "#.#", "#.#", ".#."),
+    "W": ("#.#", "#.#", "###", "###", "#.#"), "X": ("#.#", "#.#", ".#.", "#.#", "#.#"),
+    "Y": ("#.#", "#.#", ".#.", ".#.", ".#."), "Z": ("###", "..#", ".#.", "#..", "###"),
+    "0": ("###", "#.#", "#.#", "#.#", "###"), "1": (".#.", "##.", ".#.", ".#.", "###"),
+    "2": ("##.", "..#", ".#.", "#..", "###"), "3": ("##.", "..#", ".#.", "..#", "##."),
+    "4": ("#.#", "#.#", "###", "..#", "..#"), "5": ("###", "#..", "##.", "..#", "##."),
+    "6": (".##", "#..", "###", "#.#", "###"), "7": ("###", "..#", ".#.", ".#.", ".#."),
+    "8": ("###", "#.#", "###", "#.#", "###"), "9": ("###", "#.#", "###", "..#", "##."),
+    " ": ("...", "...", "...", "...", "..."), ".": ("...", "...", "...", "...", ".#."),
+    ",": ("...", "...", "...", ".#.", "#.."), "!": (".#.", ".#.", ".#.", "...", ".#."),
+    "?": ("##.", "..#", ".#.", "...", ".#."), "-": ("...", "...", "###", "...", "..."),
+    "+": ("...", ".#.", "###", ".#.", "..."), "=": ("...", "###", "...", "###", "..."),
+    ":": ("...", ".#.", "...", ".#.", "..."), "'": (".#.", ".#.", "...", "...", "..."),
+    "/": ("..#", "..#", ".#.", "#..", "#.."), "%": ("#.#", "..#", ".#.", "#..", "#.#"),
+    "(": (".#.", "#..", "#..", "#..", ".#."), ")": (".#.", "..#", "..#", "..#", ".#."),
+}
+_UNKNOWN_GLYPH = ("###", "#.#", "#.#", "#.#", "###")
+
+def text_to_bitmap(text, spacing=1):
+    """
+    Renders a string with the built-in 3x5 font.
+
+    Returns:
+        tuple: FONT_HEIGHT rows of equal length ('#' = on), usable as a shape definition.
+    """
+    rows = [[] for _ in range(FONT_HEIGHT)]
+    gap = "." * spacing
+    for i, char in enumerate(str(text)):
+        glyph = _FONT_3X5.get(char.upper(), _UNKNOWN_GLYPH)
+        for row, glyph_row in zip(rows, glyph):
+            if i:
+                row.append(gap)
+            row.append(glyph_row)
+    return tuple("".join(row) for row in rows)
+
+class _Marquee:
+    """Scrolls a text bitmap across the block grid one column per step."""
+    def __init__(self, text, num_blocks_x, num_blocks_y, step_frames, loop, gap):
+        bitmap = text_to_bitmap(text)
+        text_width = len(bitmap[0]) if bitmap else 0
+        # Blank lead-in so the text enters from the right edge
+        self.columns = [()] * num_blocks_x
+        for col in range(text_width):
+            self.columns.append(tuple(r for r, row in enumerate(bitmap) if row[col] == '#'))
+        if loop:
+            self.columns.extend([()] * gap) # Repeats wrap around after the gap
+        else:
+            self.columns.extend([()] * num_blocks_x) # Lead-out so the text leaves on the left
+        self.num_blocks_x = num_blocks_x
+        self.top = (num_blocks_y - FONT_HEIGHT) // 2 # Vertically centered (may be negative: cropped)
+        self.num_blocks_y = num_blocks_y
+        self.step_frames = max(1, int(step_frames))
+        self.loop = loop
+        self.offset = 0
+        self.frame = 0
+        self.finished = False
+
+    def mask(self):
+        """Block IDs highlighted at the current scroll offset."""
+        ids = []
+        columns = self.columns
+        count = len(columns)
+        nx = self.num_blocks_x
+        for bx in range(nx):
+            col = self.offset + bx
+            if col >= count:
+                if not self.loop:
+                    break
+                col %= count
+            for r in columns[col]:
+                by = self.top + r
+                if 0 <= by < self.num_blocks_y:
+                    ids.append(by * nx + bx)
+        return frozenset(ids)
+
+    def advance(self):
+        """Counts one frame; returns the new mask when the text scrolled, otherwise None."""
+        self.frame += 1
+        if self.frame < self.step_frames:
+            return None
+        self.frame = 0
+        self.offset += 1
+        if self.loop:
+            self.offset %= len(self.columns)
+        elif self.offset > len(self.columns) - self.num_blocks_x:
+            self.finished = True
+            return None
+        return self.mask()
+
+# --- Shape Sequences ---
+
+_TRANSITIONS = ('cut', 'dissolve', 'wipe', 'fade')
+
+class _Sequence:
+    """
+    A timeline of keyframes with every per-frame highlight diff precomputed.
+
+    Events map a frame number to a tuple of operations:
+        ('flip', turn_on_ids, turn_off_ids[, fade_frames]) - highlight diff, touching only the blocks that change
+        ('shape', shape_name)               - keyframe reached
+
+    Transitions are limited to the frames of the step they lead into, so every keyframe
+    is fully reached before the next diff starts. The first pass transitions from the
+    highlight state at load time; when looping, later passes use a second event table
+    that transitions from the state the first pass ends in.
+    """
+    def __init__(self, keyframes, loop, config, num_blocks_x, current_ids, rng=None):
+        self.loop = loop and bool(keyframes)
+        self.frame = 0
+        self.finished = False
+        self._config = config
+        self._num_blocks_x = num_blocks_x
+        self._rng = rng or random.Random()
+        self.length = sum(max(1, round(duration / config["animation_interval"])) for _, _, duration, _, _ in keyframes)
+        self.events, reached = self._plan(keyframes, current_ids)
+        self.loop_events = self._plan(keyframes, reached)[0] if self.loop else None
+
+    def _plan(self, keyframes, previous):
+        """
+        Builds the {frame: ops} table for one pass over keyframes, starting from the previous highlight set.
+
+        Returns:
+            tuple: (events, highlight set reached at the end of the pass).
+        """
+        config = self._config
+        interval = config["animation_interval"]
+        events = {}
+        def add(frame, op):
+            events[frame] = events.get(frame, ()) + (op,)
+
+        frame = 0
+        reached = set(previous)
+        for shape_name, mask, duration, transition, transition_time in keyframes:
+            turn_on = sorted(mask - reached)
+            turn_off = sorted(reached - mask)
+            step_frames = max(1, round(duration / interval))
+            # A transition never outlasts its step, so the next diff starts from a finished keyframe
+            steps = 1 if transition == 'cut' else min(step_frames, max(1, round(transition_time / interval)))
+            if transition == 'cut':
+                add(frame, ('flip', tuple(turn_on), tuple(turn_off)))
+            elif transition in ('dissolve', 'wipe'):
+                changes = [(block_id, True) for block_id in turn_on] + [(block_id, False) for block_id in turn_off]
+                if transition == 'dissolve':
+                    self._rng.shuffle(changes)
+                else: # Left to right, one group of block columns per frame
+                    changes.sort(key=lambda change: change[0] % self._num_blocks_x)
+                for k in range(steps):
+                    chunk = changes[k * len(changes) // steps:(k + 1) * len(changes) // steps]
+                    if chunk:
+                        add(frame + k, ('flip', tuple(b for b, on in chunk if on), tuple(b for b, on in chunk if not on)))
+            else: # 'fade': switch the highlight and let every changed dot ease into its new range
+                add(frame, ('flip', tuple(turn_on), tuple(turn_off), steps))
+            add(frame, ('shape', shape_name))
+            frame += step_frames
+            reached.difference_update(turn_off)
+            reached.update(turn_on)
+        return events, reached
+
+    def advance(self):
+        """Returns the operations for the current frame and moves to the next one."""
+        ops = self.events.get(self.frame, ())
+        self.frame += 1
+        if self.frame >= self.length:
+            if self.loop:
+                self.frame = 0
+                self.events = self.loop_events
+            else:
+                self.finished = True
+        return ops
 
 class _Block:
-    """Represents a block (group) of dots."""
-    def __init__(self, id, center_x, center_y):
+    """Represents a block (group) of dots: a contiguous range of indices in the dot store."""
+    __slots__ = ('id', 'center_x', 'center_y', '_store', 'dot_start', 'dot_end',
+                 'is_high_brightness', 'id_handle', '_id_color')
+
+    def __init__(self, id, center_x, center_y, store=None, dot_start=0, dot_end=0):
         self.id = id
         self.center_x = center_x
         self.center_y = center_y
-        self.dots = [] # List to hold _Dot objects belonging to this block
+        self._store = store
+        self.dot_start = dot_start # First dot index belonging to this block
+        self.dot_end = dot_end # One past the last dot index
         self.is_high_brightness = False # Flag indicating if this block is part of the target shape
+        self.id_handle = None # Persistent ID label text object, created once by draw_id
+        self._id_color = None # Color the label was last drawn/recolored with
+
+    @property
+    def dot_indices(self):
+        """Range of this block's indices in the dot store."""
+        return range(self.dot_start, self.dot_end)
+
+    @property
+    def dots(self):
+        """_Dot views of the dots belonging to this block."""
+        return [_Dot(self._store, i) for i in range(self.dot_start, self.dot_end)]
 
     def add_dot(self, dot_obj):
-        """Adds a _Dot object to this block."""
-        self.dots.append(dot_obj)
+        """Adds a _Dot to this block; dots must be added in store order so the range stays contiguous."""
+        if self.dot_end == self.dot_start:
+            self._store = dot_obj._store
+            self.dot_start = dot_obj.index
+        elif dot_obj.index != self.dot_end:
+            raise ValueError(f"Dot {dot_obj.index} is not contiguous with block {self.id}")
+        self.dot_end = dot_obj.index + 1
 
     def set_highlight(self, is_high):
         """Sets the highlight status for this block."""
@@ -82,19 +1165,29 @@ class _Block:
         self.is_high_brightness = is_high
         return changed
 
-    def get_random_brightness(self, config):
-        """Returns a random brightness value based on highlight status."""
+    def get_random_brightness(self, config, rng=None):
+        """Returns a random brightness value based on highlight status, drawn from rng (default: the random module)."""
+        randint = (rng or random).randint
         if self.is_high_brightness:
-            return random.randint(config["high_brightness_min"], config["high_brightness_max"])
+            return randint(config["high_brightness_min"], config["high_brightness_max"])
         else:
-            return random.randint(config["low_brightness_min"], config["low_brightness_max"])
+            return randint(config["low_brightness_min"], config["low_brightness_max"])
 
     def draw_id(self, gui, config):
-        """Draws the block's ID number on the screen."""
+        """Draws the block's ID label once, afterwards only recoloring it if id_color changed."""
         if not config["show_ids"] or not gui:
             return
+        if self.id_handle is not None:
+            if self._id_color != config["id_color"]:
+                try:
+                    self.id_handle.config(color=config["id_color"])
+                    self._id_color = config["id_color"]
+                except Exception as e:
+                    print(f"Error recoloring text ID {self.id}: {e}", file=sys.stderr, flush=True)
+            return
+        self._id_color = config["id_color"]
         try:
-            gui.draw_text(
+            self.id_handle = gui.draw_text(
                 x=self.center_x,
                 y=self.center_y,
                 text=str(self.id),
@@ -107,7 +1200,7 @@ class _Block:
                  font_size = config["id_font_size"]
                  offset_x = int(font_size * 0.3 * len(str(self.id)))
                  offset_y = int(font_size * 0.5)
-                 gui.draw_text(
+                 self.id_handle = gui.draw_text(
                     x=self.center_x - offset_x,
                     y=self.center_y - offset_y,
                     text=str(self.id),
@@ -117,27 +1210,463 @@ class _Block:
             except Exception as e2:
                  print(f"Error drawing text ID {self.id} (fallback failed): {e2}", file=sys.stderr, flush=True)
 
-    def redraw_dots(self, gui, config, force_brightness_range=None):
-        """Redraws all dots in this block, optionally forcing a specific brightness range."""
+    def remove_id(self, gui):
+        """Removes the block's ID label from the screen, if it exists."""
+        if self.id_handle is None:
+            return
+        try:
+            gui.remove(self.id_handle)
+        except Exception as e:
+            print(f"Error removing text ID {self.id}: {e}", file=sys.stderr, flush=True)
+        self.id_handle = None
+
+    def raise_id(self, gui, config):
+        """Re-creates the ID label on top of dots that were just drawn as new canvas items."""
+        if self.id_handle is None:
+            return
+        self.remove_id(gui)
+        self.draw_id(gui, config)
+
+    def redraw_dots(self, gui, config, force_brightness_range=None, palette=None, rng=None):
+        """Redraws all dots in this block, optionally forcing a specific brightness range. Returns the error count."""
+        if palette is None:
+            palette = _GREY_PALETTE
+        randint = (rng or random).randint
+        errors = 0
         for dot in self.dots:
             if force_brightness_range is not None:
                  if force_brightness_range == 'low':
-                     gray_level = random.randint(config["low_brightness_min"], config["low_brightness_max"])
+                     gray_level = randint(config["low_brightness_min"], config["low_brightness_max"])
                  elif force_brightness_range == 'high':
-                      gray_level = random.randint(config["high_brightness_min"], config["high_brightness_max"])
+                      gray_level = randint(config["high_brightness_min"], config["high_brightness_max"])
                  else:
                      gray_level = force_brightness_range
             else:
-                gray_level = self.get_random_brightness(config)
+                gray_level = self.get_random_brightness(config, rng)
 
-            hex_val = f'{gray_level:02x}'
-            dot_color = f'#{hex_val}{hex_val}{hex_val}'
+            dot_color = palette[gray_level]
             try:
-                gui.draw_rect(x=dot.x, y=dot.y, w=config['dot_size'], h=config['dot_size'],
-                              fill=dot_color, outline=dot_color)
+                dot.paint(gui, config['dot_size'], dot_color)
+                dot.level = gray_level
             except Exception as e:
+                errors += 1
                 print(f"Error redrawing dot in block {self.id} at ({dot.x},{dot.y}): {e}", file=sys.stderr, flush=True)
+        return errors
+
+
+# --- Instrumentation ---
+
+class FrameStats:
+    """
+    Lightweight frame-time instrumentation for DotMatrixDisplay.
+
+    Recording a frame is a handful of additions and one deque append; percentiles
+    are only computed when summary() is requested.
+    """
+    PHASES = ("highlight", "select", "brightness", "color", "draw", "ids")
+
+    def __init__(self, window=300):
+        self.frame_times = collections.deque(maxlen=window) # Seconds spent in update_frame
+        self.frame_starts = collections.deque(maxlen=window) # perf_counter() at frame start
+        self.reset()
+
+    def reset(self):
+        """Clears all counters and the rolling window."""
+        self.frame_times.clear()
+        self.frame_starts.clear()
+        self.frames = 0
+        self.phase_totals = dict.fromkeys(self.PHASES, 0.0)
+        self.last_phases = dict.fromkeys(self.PHASES, 0.0)
+        self.draw_calls = 0 # Total backend calls
+        self.last_draw_calls = 0
+        self.backend_errors = 0
+        self.skipped_draws = 0 # Sampled dots not drawn because their color did not change
+        self.last_log_time = time.perf_counter()
+
+    def record_frame(self, marks, draw_calls, errors=0, skipped=0):
+        """
+        Records one frame.
+
+        Args:
+            marks (tuple): perf_counter() values at the start of the frame and after each phase in PHASES.
+            draw_calls (int): Backend calls issued for the frame (including highlight redraws since the previous one).
+            errors (int): Backend errors raised during the frame.
+            skipped (int): Sampled dots left alone because their color was unchanged.
+        """
+        for i, phase in enumerate(self.PHASES):
+            duration = marks[i + 1] - marks[i]
+            self.last_phases[phase] = duration
+            self.phase_totals[phase] += duration
+        self.frame_times.append(marks[-1] - marks[0])
+        self.frame_starts.append(marks[0])
+        self.frames += 1
+        self.draw_calls += draw_calls
+        self.last_draw_calls = draw_calls
+        self.backend_errors += errors
+        self.skipped_draws += skipped
+
+    def percentile(self, p):
+        """Returns the p-th percentile (0-100) of recent frame times in seconds (0.0 if empty)."""
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def fps(self):
+        """Achieved frames per second over the rolling window."""
+        if len(self.frame_starts) < 2:
+            return 0.0
+        span = self.frame_starts[-1] - self.frame_starts[0]
+        return (len(self.frame_starts) - 1) / span if span > 0 else 0.0
+
+    def summary(self, target_interval=None):
+        """Returns the current statistics as a plain dict."""
+        frames = max(1, self.frames)
+        summary = {
+            "frames": self.frames,
+            "fps": self.fps(),
+            "frame_time_p50": self.percentile(50),
+            "frame_time_p95": self.percentile(95),
+            "frame_time_p99": self.percentile(99),
+            "frame_time_max": max(self.frame_times, default=0.0),
+            "phase_avg": {phase: total / frames for phase, total in self.phase_totals.items()},
+            "draw_calls_per_frame": self.draw_calls / frames,
+            "last_draw_calls": self.last_draw_calls,
+            "skipped_draws_per_frame": self.skipped_draws / frames,
+            "backend_errors": self.backend_errors,
+        }
+        if target_interval:
+            summary["target_fps"] = 1.0 / target_interval
+        return summary
+
+    def format_line(self, target_interval=None):
+        """Formats a one-line summary suitable for periodic logging."""
+        summary = self.summary(target_interval)
+        target = f"/{summary['target_fps']:.1f}" if target_interval else ""
+        phases = " ".join(f"{phase}={avg * 1000:.2f}" for phase, avg in summary["phase_avg"].items())
+        return (f"FPS {summary['fps']:.1f}{target} | frame p50/p95/p99 "
+                f"{summary['frame_time_p50'] * 1000:.2f}/{summary['frame_time_p95'] * 1000:.2f}/"
+                f"{summary['frame_time_p99'] * 1000:.2f} ms | phases(ms) {phases} | "
+                f"draws/frame {summary['draw_calls_per_frame']:.1f} (skipped {summary['skipped_draws_per_frame']:.1f}) | errors {summary['backend_errors']}")
 
+# --- Scheduling ---
+
+class FrameScheduler:
+    """
+    Paces a frame loop on absolute deadlines (start + n * interval), so timing errors never accumulate.
+
+    Sleeps until each deadline instead of polling. When a frame runs more than a full interval late,
+    the 'skip' policy drops the missed slots and re-aligns to the deadline grid, while 'catch_up'
+    runs the missed frames back-to-back (at most max_catch_up of them, then re-aligns).
+    """
+    def __init__(self, interval, policy='skip', max_catch_up=5, stop_event=None):
+        if policy not in ('skip', 'catch_up'):
+            raise ValueError(f"Unknown frame policy: {policy!r}")
+        self.interval = interval
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.stop_event = stop_event # Optional threading.Event that interrupts waiting
+        self.frames = 0 # Frames released by wait()
+        self.missed_deadlines = 0 # Stalls: runs of frames that started more than one interval late
+        self.skipped_frames = 0 # Frame slots dropped by the 'skip' policy (or a catch-up overflow)
+        self._next_deadline = None
+        self._late = False # The previous frame was already late (catch-up frames of the same stall)
+
+    def reset(self):
+        """Restarts the deadline grid at the current time."""
+        self._next_deadline = None
+        self._late = False
+
+    def time_until_next(self):
+        """Seconds until the next deadline (0 if due or not started)."""
+        if self._next_deadline is None:
+            return 0.0
+        return max(0.0, self._next_deadline - time.monotonic())
+
+    def wait(self):
+        """
+        Blocks until the next frame is due.
+
+        Returns:
+            bool: False if the stop event was set while waiting, True otherwise.
+        """
+        delay = self.time_until_next()
+        if delay > 0:
+            if self.stop_event is not None:
+                if self.stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+        elif self.stop_event is not None and self.stop_event.is_set():
+            return False
+        self.advance()
+        return True
+
+    def advance(self, now=None):
+        """
+        Accounts for a frame released at 'now' (default: current time) and sets the following deadline.
+
+        wait() calls this itself; event-loop drivers that sleep on time_until_next() call it directly.
+        """
+        if now is None:
+            now = time.monotonic()
+        self.frames += 1
+        if self._next_deadline is None:
+            self._next_deadline = now + self.interval
+            return
+        lateness = now - self._next_deadline
+        if lateness < self.interval:
+            self._late = False
+        else:
+            if not self._late: # Back-to-back catch-up frames belong to the same stall
+                self.missed_deadlines += 1
+                self._late = True
+            behind = int(lateness // self.interval)
+            if self.policy == 'skip' or behind > self.max_catch_up:
+                self.skipped_frames += behind
+                self._next_deadline += behind * self.interval
+        self._next_deadline += self.interval
+
+# --- Recording ---
+# Stream layout (little-endian): the magic b'UDMR' and a version byte, then records that each
+# start with a one-byte tag:
+#   b'G' geometry: <HHhhHHHI> screen w/h, viewport x/y/w/h, dot size, dot count, then the
+#        dot x and y columns as int16
+#   b'P' palette: 256 x 3 RGB bytes indexed by brightness level
+#   b'C' clear:  <I> microseconds since the previous timed record; every dot shows level 0
+#   b'F' frame:  <IIB> microseconds since the previous timed record, dot count, delta width
+#        (1, 2 or 4 bytes), then the gaps between the sorted dot indices (the first one from
+#        index 0) and one level byte per dot
+#   b'S' shape:  <H> byte length, then the UTF-8 shape name
+
+_RECORDING_MAGIC = b'UDMR\x01'
+_DELTA_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+class FrameRecorder:
+    """
+    Writes a compact, delta-encoded log of everything a display shows (see FramePlayer).
+
+    Each call only packs a few bytes and appends them to a buffered file, so recording
+    does not slow the frame loop. Use DotMatrixDisplay.start_recording() to attach one.
+    """
+    def __init__(self, file, buffer_size=65536):
+        """
+        Args:
+            file: A path, or a binary file object opened for writing.
+            buffer_size (int, optional): Write buffer size when a path is given.
+        """
+        self._owns_file = isinstance(file, (str, bytes, os.PathLike))
+        self.file = open(file, 'wb', buffering=buffer_size) if self._owns_file else file
+        self.file.write(_RECORDING_MAGIC)
+        self._last_time = None
+        self.frames = 0
+
+    def _elapsed_us(self, timestamp):
+        """Microseconds since the previous timed record (0 for the first)."""
+        last, self._last_time = self._last_time, timestamp
+        return 0 if last is None else max(0, min(0xFFFFFFFF, round((timestamp - last) * 1e6)))
+
+    def write_geometry(self, screen_size, viewport, dot_size, xs, ys):
+        """Records the screen, viewport and dot coordinates that later frames refer to."""
+        header = struct.pack('<HHhhHHHI', *screen_size, *viewport, dot_size, len(xs))
+        self.file.write(b'G' + header + bytes(array('h', xs)) + bytes(array('h', ys)))
+
+    def write_palette(self, palette):
+        """Records the brightness-to-color table as RGB bytes."""
+        self.file.write(b'P' + b''.join(_color_bytes(color) for color in palette))
+
+    def write_clear(self, timestamp):
+        """Records that every dot was reset to level 0."""
+        self.file.write(b'C' + struct.pack('<I', self._elapsed_us(timestamp)))
+
+    def write_frame(self, timestamp, indices, levels):
+        """
+        Records the dots drawn in one frame.
+
+        Args:
+            timestamp (float): time.perf_counter() at the start of the frame.
+            indices (list): Sorted, unique dot indices.
+            levels (bytes-like): The level shown by each of those dots.
+        """
+        deltas = [indices[0]] if indices else []
+        deltas += [b - a for a, b in zip(indices, indices[1:])]
+        largest = max(deltas, default=0)
+        width = 1 if largest < 0x100 else 2 if largest < 0x10000 else 4
+        self.file.write(b'F' + struct.pack('<IIB', self._elapsed_us(timestamp), len(indices), width))
+        self.file.write(bytes(array(_DELTA_TYPECODES[width], deltas)))
+        self.file.write(bytes(levels))
+        self.frames += 1
+
+    def write_shape(self, name):
+        """Records a change of the displayed shape name."""
+        data = name.encode('utf-8')[:0xFFFF]
+        self.file.write(b'S' + struct.pack('<H', len(data)) + data)
+
+    def close(self):
+        """Flushes the stream (and closes it if the recorder opened it)."""
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+class FramePlayer:
+    """
+    Replays a FrameRecorder stream into any GUI backend or DotMatrixDisplay.
+
+    Frames are applied as fast as possible, or in real time using the recorded frame timing.
+    """
+    def __init__(self, file):
+        """
+        Args:
+            file: A path, or a binary file object opened for reading.
+        """
+        self.file = file
+
+    def records(self):
+        """
+        Yields the decoded records of the stream as tuples:
+            ('geometry', screen_size, viewport, dot_size, xs, ys)
+            ('palette', colors) - 256 '#rrggbb' strings
+            ('clear', elapsed_s)
+            ('frame', elapsed_s, indices, levels)
+            ('shape', name)
+
+        Raises:
+            ValueError: If the stream is not a recording or is truncated.
+        """
+        owns_file = isinstance(self.file, (str, bytes, os.PathLike))
+        f = open(self.file, 'rb') if owns_file else self.file
+        try:
+            def read(size):
+                data = f.read(size)
+                if len(data) != size:
+                    raise ValueError("truncated recording")
+                return data
+            if f.read(len(_RECORDING_MAGIC)) != _RECORDING_MAGIC:
+                raise ValueError("not a dot matrix recording")
+            while True:
+                tag = f.read(1)
+                if not tag:
+                    return
+                if tag == b'F':
+                    elapsed, count, width = struct.unpack('<IIB', read(9))
+                    if width not in _DELTA_TYPECODES:
+                        raise ValueError("corrupt frame record")
+                    deltas = array(_DELTA_TYPECODES[width])
+                    deltas.frombytes(read(count * width))
+                    indices = list(itertools.accumulate(deltas))
+                    yield ('frame', elapsed / 1e6, indices, read(count))
+                elif tag == b'S':
+                    (length,) = struct.unpack('<H', read(2))
+                    yield ('shape', read(length).decode('utf-8'))
+                elif tag == b'C':
+                    yield ('clear', struct.unpack('<I', read(4))[0] / 1e6)
+                elif tag == b'P':
+                    rgb = read(768)
+                    yield ('palette', [sys.intern('#' + rgb[i:i + 3].hex()) for i in range(0, 768, 3)])
+                elif tag == b'G':
+                    width, height, vx, vy, vw, vh, dot_size, count = struct.unpack('<HHhhHHHI', read(18))
+                    xs, ys = array('h'), array('h')
+                    xs.frombytes(read(2 * count))
+                    ys.frombytes(read(2 * count))
+                    yield ('geometry', (width, height), (vx, vy, vw, vh), dot_size, xs, ys)
+                else:
+                    raise ValueError(f"unknown record {tag!r}")
+        finally:
+            if owns_file:
+                f.close()
+
+    def play(self, target, realtime=False, speed=1.0, stop_event=None):
+        """
+        Draws the recording onto target.
+
+        Args:
+            target: A GUI backend (NullGUI, FramebufferGUI, UniHiker GUI, ...) or a DotMatrixDisplay.
+                    A display whose dot count matches the recording is repainted through its own
+                    dot objects; otherwise the recording is drawn on the display's GUI.
+            realtime (bool, optional): Sleep so frames appear with their recorded timing.
+            speed (float, optional): Playback speed factor for realtime mode.
+            stop_event (threading.Event, optional): Stops playback when set.
+
+        Returns:
+            int: The number of frames played.
+        """
+        display = target if isinstance(target, DotMatrixDisplay) else None
+        gui = display.gui if display is not None else target
+        store = None
+        palette = _GREY_PALETTE
+        frames = 0
+        clock = time.monotonic()
+        for record in self.records():
+            if stop_event is not None and stop_event.is_set():
+                break
+            kind = record[0]
+            if kind == 'geometry':
+                _, _, viewport, dot_size, xs, ys = record
+                if display is not None and len(display.dot_store) == len(xs):
+                    store = display.dot_store
+                else:
+                    store = _DotStore(xs, ys)
+                    gui.draw_rect(x=viewport[0], y=viewport[1], w=viewport[2], h=viewport[3],
+                                  fill=palette[0], outline=palette[0])
+            elif kind == 'palette':
+                palette = record[1]
+            elif kind == 'shape':
+                if display is not None:
+                    display.selected_shape_name = record[1]
+            elif store is not None: # 'clear' or 'frame'
+                if realtime:
+                    clock += record[1] / speed
+                    delay = clock - time.monotonic()
+                    if delay > 0:
+                        if stop_event is not None:
+                            stop_event.wait(delay)
+                        else:
+                            time.sleep(delay)
+                if kind == 'clear':
+                    indices, levels = range(len(store)), bytes(len(store))
+                else:
+                    _, _, indices, levels = record
+                    frames += 1
+                for index, level in zip(indices, levels):
+                    if store.handles[index] is None and store is not getattr(display, "dot_store", None):
+                        color = palette[level]
+                        store.handles[index] = gui.draw_rect(x=store.x[index], y=store.y[index], w=dot_size,
+                                                             h=dot_size, fill=color, outline=color)
+                    else:
+                        store.paint(index, gui, dot_size, palette[level])
+                    store.level[index] = level
+                flush = getattr(gui, "flush", None)
+                if flush is not None:
+                    flush()
+        return frames
+
+class _UpdateRateController:
+    """
+    Closed-loop scale for the update percentages.
+
+    Keeps a smoothed update_frame duration and nudges the scale toward the value that
+    would make it match the target (frame time is roughly proportional to the dots
+    drawn), so the loop sheds dots under load and adds them back when there is headroom.
+    """
+    def __init__(self, smoothing=0.2, gain=0.3):
+        self.smoothing = smoothing # EWMA weight of the newest frame time
+        self.gain = gain # Fraction of the remaining correction applied per frame
+        self.scale = 1.0
+        self.frame_time = None # Smoothed seconds per update_frame
+
+    def update(self, frame_time, target, scale_min, scale_max):
+        """Feeds one measured frame time and returns the new scale."""
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        else:
+            self.frame_time += self.smoothing * (frame_time - self.frame_time)
+        if self.frame_time > 0 and target > 0:
+            # Limit each step so a single outlier frame cannot collapse the density
+            ratio = min(2.0, max(0.5, target / self.frame_time))
+            self.scale += self.gain * (self.scale * ratio - self.scale)
+        self.scale = min(scale_max, max(scale_min, self.scale))
+        return self.scale
 
 # --- Main Library Class ---
 
@@ -148,150 +1677,638 @@ class DotMatrixDisplay:
     Allows setting predefined shapes to be displayed with higher brightness
     against a dimmer background, both animated with random flickering.
     """
-    def __init__(self, config=None):
+    def __init__(self, config=None, gui=None):
         """
         Initializes the DotMatrixDisplay.
 
         Args:
             config (dict, optional): A dictionary overriding default configuration values.
                                      Defaults to DEFAULT_CONFIG.
+            gui (object, optional): A GUI-compatible backend to draw on (e.g. NullGUI, FramebufferGUI).
+                                    Defaults to the backend named by config["backend"].
         """
         # Merge provided config with defaults
         self.config = DEFAULT_CONFIG.copy()
         if config:
             self.config.update(config)
 
-        try:
-            self.gui = GUI()
-        except Exception as e:
-             print(f"Error initializing UniHiker GUI: {e}", file=sys.stderr, flush=True)
-             print("Please ensure the UniHiker library is installed and configured correctly.", file=sys.stderr, flush=True)
-             # Optionally, re-raise the exception or exit if GUI is critical
-             # raise e
-             self.gui = None # Set gui to None if initialization fails
-             # Or exit: sys.exit(1)
+        self.screen_width = self.config["screen_width"] # Physical size of the screen
+        self.screen_height = self.config["screen_height"]
+        # Area of the screen owned by this display
+        self.viewport = tuple(self.config["viewport"] or (0, 0, self.screen_width, self.screen_height))
+
+        # Per-display random state, so frames are reproducible for a given seed
+        self.rng = None
+        self.np_rng = None
+        self.reseed(self.config["seed"])
+
+        if gui is not None:
+            self.gui = gui
+        else:
+            try:
+                self.gui = create_backend(self.config["backend"], self.screen_width, self.screen_height)
+            except Exception as e:
+                 print(f"Error initializing {self.config['backend']} GUI backend: {e}", file=sys.stderr, flush=True)
+                 print("Please ensure the UniHiker library is installed and configured correctly.", file=sys.stderr, flush=True)
+                 # Optionally, re-raise the exception or exit if GUI is critical
+                 # raise e
+                 self.gui = None # Set gui to None if initialization fails
+                 # Or exit: sys.exit(1)
 
+        # Drawing coordinates of the viewport's top-left corner on self.gui
+        self.origin_x, self.origin_y = self.viewport[:2]
+        if self.gui is not None and self.config["render_mode"] == 'composite':
+            # The compositor covers just the viewport and places it on the wrapped GUI
+            self.gui = CompositorGUI(self.gui, self.viewport[2], self.viewport[3],
+                                     self.config["composite_tile_size"], origin=self.viewport[:2])
+            self.origin_x = self.origin_y = 0
 
-        self.screen_width = 240 # Assuming fixed size for now
-        self.screen_height = 320
         self.blocks = {} # Dictionary to store blocks by ID for easy lookup
-        self.all_dots = [] # List of all _Dot objects (representing super dots)
+        self.dot_store = _DotStore() # Columns for all super dots
+        self.all_dots = _DotSequence(self.dot_store) # _Dot views of the store, for compatibility
         self.num_total_dots = 0
+        self.num_blocks_x = 0 # Block grid size, set by the layout pass
+        self.num_blocks_y = 0
+        self.high_brightness_dots = _DotPartition(0) # Dot indices of highlighted blocks, kept in sync by set_target_shape
+        self.low_brightness_dots = _DotPartition(0)  # Dot indices of all other blocks
+        self._bg_handle = None # Persistent background rectangle (retained mode)
+        self._engine = None # _NumpyFrameEngine when vectorized frame generation is active
+        self._ids_key = None # (show_ids, id_color) the ID labels were last synced with
+        self.stats = FrameStats(self.config["stats_window"]) if self.config["collect_stats"] else None
+        # Shape changes from other threads are published here (the back buffer of the highlight
+        # state) and swapped in by update_frame, so only the render thread ever draws
+        self._lock = threading.Lock()
+        self._pending_highlight = None # frozenset of block IDs waiting to be applied
+        self._render_thread = None # Ident of the thread calling update_frame
+        self._loop_running = False # Set by the run loops: highlight changes always wait for update_frame
+        self._frame_waiters = [] # asyncio futures resolved after the next run_async frame
+        self._highlighted_ids = set() # Block IDs currently highlighted (front buffer)
+        self._marquee = None # Active _Marquee, advanced by update_frame
+        self._sequence = None # Active _Sequence, advanced by update_frame
+        self._recorder = None # Active FrameRecorder, fed by update_frame
+        self._rate_controller = _UpdateRateController() # Used when config["adaptive_update"] is on
+        self._side_draw_calls = 0 # Backend calls from highlight changes and label raises, counted into the next frame's stats
+        self._recorded_ranges = [] # Dot index ranges repainted outside the sampled set since the last frame
+        self._recorded_shape = None
+        self.palette = _GREY_PALETTE # Brightness level -> color string, see rebuild_palette()
+        self._palette_key = None
+        self.rebuild_palette()
         self.selected_shape_name = "none" # Keep track of the current shape name
 
         self._calculate_layout_and_create_objects()
         self.initialize_display() # Perform initial clear and draw
 
+    def reseed(self, seed=None):
+        """
+        Resets this display's random number generators.
+
+        Every random choice (dot sampling, brightness levels, dissolve order) comes from
+        self.rng, or from self.np_rng on the NumPy engine, so the same seed, config and
+        calls reproduce the same frames. seed=None seeds from system entropy.
+        """
+        self.rng = random.Random(seed)
+        if np is not None:
+            self.np_rng = np.random.default_rng(seed)
+            if getattr(self, "_engine", None) is not None:
+                self._engine.rng = self.np_rng
+
+    def rebuild_palette(self):
+        """
+        Rebuilds the brightness-to-color lookup table from the current config.
+
+        Uses config["palette"] when given (256 color strings), otherwise blends from
+        bg_color to dot_color, then quantizes to config["brightness_levels"] steps.
+        Called automatically when those settings change.
+        """
+        custom = self.config.get("palette")
+        self._palette_key = (self.config["bg_color"], self.config["dot_color"], id(custom), self.config["brightness_levels"])
+        if custom is not None:
+            if len(custom) != 256:
+                raise ValueError(f"config['palette'] must have 256 entries, got {len(custom)}")
+            self.palette = [sys.intern(str(color)) for color in custom]
+        elif self._palette_key[:2] == ('black', 'white'):
+            self.palette = _GREY_PALETTE
+        else:
+            try:
+                self.palette = _build_palette(self.config["bg_color"], self.config["dot_color"])
+            except ValueError as e:
+                # The GUI still gets bg_color as is; only the brightness blend needs RGB values
+                print(f"Warning: {e}; using the grey palette.", file=sys.stderr, flush=True)
+                self.palette = _GREY_PALETTE
+        steps = self.config["brightness_levels"]
+        if 2 <= steps < 256:
+            # Snap every level to the nearest of `steps` evenly spaced levels
+            palette = self.palette
+            self.palette = [palette[round(round(level * (steps - 1) / 255) * 255 / (steps - 1))] for level in range(256)]
+        # Levels that map to the same color share a code, so redraws can skip invisible changes
+        first_level = {}
+        self.palette_codes = array('B', (first_level.setdefault(color, level) for level, color in enumerate(self.palette)))
+        if getattr(self, "_recorder", None) is not None:
+            self._recorder.write_palette(self.palette)
+
     def _calculate_layout_and_create_objects(self):
         """Calculates grid layout and creates _Block and _Dot objects."""
-        # --- Calculations for Centering (uses original block_size for layout) ---
-        orig_dot_size = 4 # Need original size for accurate block dimension calc
-        dot_spacing = self.config["dot_spacing"]
-        block_size = self.config["block_size"] # Original 6x6 layout
-        block_gap_dots = self.config["block_gap_dots"]
-        super_dot_size = self.config["dot_size"] # The size for drawing
-        super_dot_offset = self.config["super_dot_offset"]
+        layout = _get_layout(self.viewport[2], self.viewport[3], self.config, self.config["rotation"],
+                             (self.origin_x, self.origin_y))
+        self.num_blocks_x = layout.num_blocks_x
+        self.num_blocks_y = layout.num_blocks_y
 
-        # Calculate the pixel dimension of the original 6x6 block area
-        block_pixel_dimension = (block_size - 1) * dot_spacing + orig_dot_size
-        gap_pixel_size = block_gap_dots * dot_spacing
-
-        num_blocks_x = 0
-        if block_pixel_dimension <= self.screen_width:
-            current_width = block_pixel_dimension
-            num_blocks_x = 1
-            while current_width + gap_pixel_size + block_pixel_dimension <= self.screen_width:
-                current_width += gap_pixel_size + block_pixel_dimension
-                num_blocks_x += 1
-        num_blocks_y = 0
-        if block_pixel_dimension <= self.screen_height:
-            current_height = block_pixel_dimension
-            num_blocks_y = 1
-            while current_height + gap_pixel_size + block_pixel_dimension <= self.screen_height:
-                current_height += gap_pixel_size + block_pixel_dimension
-                num_blocks_y += 1
-
-        if num_blocks_x > 0: total_grid_width = (num_blocks_x * block_pixel_dimension) + max(0, (num_blocks_x - 1)) * gap_pixel_size
-        else: total_grid_width = 0
-        if num_blocks_y > 0: total_grid_height = (num_blocks_y * block_pixel_dimension) + max(0, (num_blocks_y - 1)) * gap_pixel_size
-        else: total_grid_height = 0
-        padding_x = (self.screen_width - total_grid_width) // 2
-        padding_y = (self.screen_height - total_grid_height) // 2
-
-        first_orig_dot_center_x = padding_x + orig_dot_size // 2
-        first_orig_dot_center_y = padding_y + orig_dot_size // 2
-        total_block_step = block_pixel_dimension + gap_pixel_size
-
-        # --- Create Blocks and the 4 Super Dots per block ---
+        # --- Fill the dot store and create Blocks over contiguous dot ranges ---
+        self.dot_store = store = _DotStore(layout.dot_x, layout.dot_y, layout.dot_group)
+        self.all_dots = _DotSequence(store)
         self.blocks = {}
-        self.all_dots = []
-        group_id_counter = 0
-
-        # print("Calculating dot positions and group info...") # Less verbose for library
-        for block_idx_y in range(num_blocks_y):
-            block_start_orig_dot_center_y = first_orig_dot_center_y + block_idx_y * total_block_step
-            for block_idx_x in range(num_blocks_x):
-                block_start_orig_dot_center_x = first_orig_dot_center_x + block_idx_x * total_block_step
-                block_center_x = block_start_orig_dot_center_x + (block_pixel_dimension - orig_dot_size) / 2
-                block_center_y = block_start_orig_dot_center_y + (block_pixel_dimension - orig_dot_size) / 2
-                current_group_id = group_id_counter
-                current_block = _Block(id=current_group_id, center_x=int(block_center_x), center_y=int(block_center_y))
-                self.blocks[current_group_id] = current_block
-                for j in range(2):
-                    for i in range(2):
-                        dot_center_x = block_center_x + (-super_dot_offset if i == 0 else super_dot_offset)
-                        dot_center_y = block_center_y + (-super_dot_offset if j == 0 else super_dot_offset)
-                        rect_x = int(dot_center_x - super_dot_size // 2)
-                        rect_y = int(dot_center_y - super_dot_size // 2)
-                        if rect_x >= 0 and rect_y >= 0 and rect_x + super_dot_size <= self.screen_width and rect_y + super_dot_size <= self.screen_height:
-                             new_dot = _Dot(x=rect_x, y=rect_y, group_id=current_group_id)
-                             current_block.add_dot(new_dot)
-                             self.all_dots.append(new_dot)
-                group_id_counter += 1
-
-        self.num_total_dots = len(self.all_dots)
+        dot_start = 0
+        for block_id, ((center_x, center_y), count) in enumerate(zip(layout.block_centers, layout.block_dot_counts)):
+            self.blocks[block_id] = _Block(id=block_id, center_x=center_x, center_y=center_y,
+                                           store=store, dot_start=dot_start, dot_end=dot_start + count)
+            dot_start += count
+
+        self.num_total_dots = len(store)
+        self._highlighted_ids = set()
+        # New blocks start un-highlighted, so every dot begins in the low partition
+        self.high_brightness_dots = _DotPartition(self.num_total_dots)
+        self.low_brightness_dots = _DotPartition(self.num_total_dots, range(self.num_total_dots))
+
+        engine = self.config["engine"]
+        if engine == 'numpy' and np is None:
+            raise ImportError("config['engine'] = 'numpy' requires NumPy")
+        use_numpy = engine == 'numpy' or (engine == 'auto' and np is not None)
+        self._engine = _NumpyFrameEngine(store, self.np_rng) if use_numpy else None
+        self._fader = _BrightnessFader(store, use_numpy)
         # print(f"Calculated {self.num_total_dots} super dot positions across {len(self.blocks)} groups.")
 
     def initialize_display(self):
-        """Clears the screen and draws initial background dots."""
+        """
+        Clears the viewport and draws initial background dots.
+
+        In retained mode one rectangle object is created per dot and kept on the dot,
+        so later frames only recolor existing canvas items instead of adding new ones.
+        Calling this again recolors the existing objects rather than creating more.
+        """
         if not self.gui: return # Don't draw if GUI failed
+        bg_color = self.config['bg_color']
+        retained = self.config["retained_mode"]
         # print(f"Clearing screen with {self.config['bg_color']}...")
-        self.gui.draw_rect(x=0, y=0, w=self.screen_width, h=self.screen_height,
-                           outline=self.config['bg_color'], fill=self.config['bg_color'])
+        if self._bg_handle is not None:
+            self._bg_handle.config(fill=bg_color, outline=bg_color)
+        else:
+            bg_rect = self.gui.draw_rect(x=self.origin_x, y=self.origin_y, w=self.viewport[2], h=self.viewport[3],
+                                         outline=bg_color, fill=bg_color)
+            if retained:
+                self._bg_handle = bg_rect
         # print("Drawing initial background dots...")
-        for dot in self.all_dots:
-             self.gui.draw_rect(x=dot.x, y=dot.y, w=self.config['dot_size'], h=self.config['dot_size'],
-                                fill=self.config['bg_color'], outline=self.config['bg_color'])
+        store = self.dot_store
+        dot_size = self.config['dot_size']
+        handles = store.handles
+        for i in range(len(store)):
+            if handles[i] is not None:
+                store.paint(i, self.gui, dot_size, bg_color)
+                continue
+            rect = self.gui.draw_rect(x=store.x[i], y=store.y[i], w=dot_size, h=dot_size,
+                                      fill=bg_color, outline=bg_color)
+            if retained:
+                handles[i] = rect
+        # Zeroed in place: NumPy views of the column must stay valid (and a slice assignment resizes)
+        level = store.level
+        for i in range(len(store)):
+            level[i] = 0 # Everything now shows level 0 (bg_color)
+        self._fader.clear()
+        if self._recorder is not None:
+            self._recorder.write_clear(time.perf_counter())
+        if self._labels_covered_by_draws():
+            # The new background and dot rectangles were stacked above any existing labels
+            for block in self.blocks.values():
+                block.raise_id(self.gui, self.config)
+        self._flush_gui() # Composited tile images are created before the labels, so they stay below them
         self.draw_ids()
 
+    def set_rotation(self, rotation):
+        """
+        Rotates the matrix on the screen and redraws it.
+
+        The new layout comes from the layout cache when this geometry was used before.
+        A running marquee or sequence is stopped; a named shape is re-applied on the new grid.
+        Call it from the thread running update_frame (or while no animation is running).
+
+        Args:
+            rotation (int): Clockwise rotation in degrees: 0, 90, 180 or 270.
+        """
+        if rotation not in (0, 90, 180, 270):
+            raise ValueError(f"Unsupported rotation: {rotation!r}")
+        if rotation == self.config["rotation"]:
+            return
+        self.config["rotation"] = rotation
+        if not self.gui:
+            return
+        # The old dot rectangles and labels sit at the old positions: drop them
+        for block in self.blocks.values():
+            block.remove_id(self.gui)
+        for handle in self.dot_store.handles:
+            if handle is not None:
+                try:
+                    self.gui.remove(handle)
+                except Exception as e:
+                    print(f"Error removing dot during rotation: {e}", file=sys.stderr, flush=True)
+        shape_name = self.selected_shape_name
+        self._marquee = None
+        self._sequence = None
+        with self._lock:
+            self._pending_highlight = None
+        self._calculate_layout_and_create_objects()
+        if self._recorder is not None:
+            self._record_geometry()
+        self.initialize_display()
+        if shape_name in self.config["shapes"]:
+            self._apply_highlight(self.get_shape_mask(shape_name))
+        else:
+            self.selected_shape_name = "none"
+
     def set_target_shape(self, shape_name):
         """
         Sets the active shape to be highlighted.
 
+        Safe to call from any thread. Before any frame has been rendered, or when called from
+        the thread running update_frame, the change is applied immediately. From other threads
+        it is published atomically and applied by the render thread at the start of its next
+        update_frame, so a frame never sees a half-applied shape and only one thread draws.
+
         Args:
             shape_name (str): The name of the shape (key in config['shapes']).
                               Use "none" to turn off highlighting.
         """
         if not self.gui: return # Don't operate if GUI failed
-        self.selected_shape_name = shape_name
         # print(f"Setting target shape to: {shape_name}") # Less verbose for library
-        target_group_ids = self.config["shapes"].get(shape_name, set())
+        target_group_ids = self.get_shape_mask(shape_name)
         if not target_group_ids and shape_name != "none":
             print(f"Warning: Shape '{shape_name}' not found. Using 'none'.", file=sys.stderr, flush=True)
-            target_group_ids = self.config["shapes"]["none"]
+            target_group_ids = frozenset()
+        self._marquee = None # An explicit shape replaces any scrolling text or sequence
+        self._sequence = None
+        self.selected_shape_name = shape_name
+        self._publish_highlight(target_group_ids)
+
+    def show_text(self, text):
+        """Highlights a static string rendered with the built-in 3x5 font, centered on the grid."""
+        if not self.gui: return
+        bitmap = text_to_bitmap(text)
+        width = len(bitmap[0])
+        left = (self.num_blocks_x - width) // 2
+        top = (self.num_blocks_y - FONT_HEIGHT) // 2
+        ids = frozenset((top + r) * self.num_blocks_x + left + c
+                        for r, row in enumerate(bitmap) for c, cell in enumerate(row)
+                        if cell == '#' and 0 <= left + c < self.num_blocks_x and 0 <= top + r < self.num_blocks_y)
+        self._marquee = None
+        self._sequence = None
+        self.selected_shape_name = f"text:{text}"
+        self._publish_highlight(ids)
+
+    def start_marquee(self, text, step_frames=None, loop=True):
+        """
+        Scrolls text across the block grid, one block column every step_frames frames.
+
+        Each scroll step only touches the blocks whose highlight state changes. The text
+        enters from the right; with loop=False it scrolls out on the left and stops.
+
+        Args:
+            text (str): The message (rendered with the built-in 3x5 font).
+            step_frames (int, optional): Frames per column. Defaults to config["marquee_step_frames"].
+            loop (bool, optional): Repeat the text continuously. Defaults to True.
+        """
+        if not self.gui: return
+        if step_frames is None:
+            step_frames = self.config["marquee_step_frames"]
+        marquee = _Marquee(text, self.num_blocks_x, self.num_blocks_y, step_frames, loop, self.config["marquee_gap"])
+        self.selected_shape_name = f"marquee:{text}"
+        self._sequence = None
+        self._marquee = marquee
+        self._publish_highlight(marquee.mask())
+
+    def stop_marquee(self):
+        """Stops scrolling, leaving the current frame of text highlighted."""
+        self._marquee = None
+
+    @property
+    def marquee_active(self):
+        """True while a marquee is scrolling."""
+        return self._marquee is not None
+
+    def load_sequence(self, steps, loop=True):
+        """
+        Plays a timeline of shapes with transitions, driven by update_frame.
+
+        All per-frame highlight diffs are computed here, so each transition frame only
+        touches the blocks that change. Durations are converted to frames using
+        config["animation_interval"].
+
+        Args:
+            steps (list): Keyframes as (shape_name, duration_s[, transition[, transition_s]]) tuples
+                          or dicts with the keys "shape", "duration", "transition", "transition_time".
+                          The transition ('cut', 'dissolve', 'wipe' or 'fade') leads into that step;
+                          transition_s defaults to config["transition_duration"] and is capped
+                          at the step's duration.
+            loop (bool, optional): Restart from the first step after the last. Defaults to True.
+        """
+        if not self.gui: return
+        keyframes = []
+        for step in steps:
+            if isinstance(step, dict):
+                step = (step["shape"], step["duration"], step.get("transition", 'cut'), step.get("transition_time"))
+            shape_name, duration = step[0], step[1]
+            transition = step[2] if len(step) > 2 else 'cut'
+            transition_time = step[3] if len(step) > 3 else None
+            if transition not in _TRANSITIONS:
+                print(f"Warning: Transition '{transition}' not found. Using 'cut'.", file=sys.stderr, flush=True)
+                transition = 'cut'
+            if transition_time is None:
+                transition_time = self.config["transition_duration"]
+            if shape_name not in self.config["shapes"]:
+                print(f"Warning: Shape '{shape_name}' not found. Using 'none'.", file=sys.stderr, flush=True)
+                shape_name = "none"
+            keyframes.append((shape_name, self.get_shape_mask(shape_name), duration, transition, transition_time))
+        self._marquee = None
+        if not keyframes:
+            self._sequence = None
+            return
+        with self._lock:
+            # A published but not yet applied shape is what the first transition starts from
+            start_ids = self._pending_highlight
+        if start_ids is None:
+            start_ids = self._highlighted_ids
+        self._sequence = _Sequence(keyframes, loop, self.config, self.num_blocks_x, set(start_ids), self.rng)
+
+    def stop_sequence(self):
+        """Stops sequence playback, leaving the current highlight state as it is."""
+        self._sequence = None
+
+    @property
+    def sequence_active(self):
+        """True while a sequence is playing."""
+        return self._sequence is not None
+
+    def get_shape_mask(self, shape_name):
+        """
+        Returns the block IDs highlighted by a shape on the current block grid.
+
+        Bitmap and callable shapes are rasterized once per grid size and cached.
+        Unknown shape names yield an empty set.
+        """
+        shape = self.config["shapes"].get(shape_name)
+        if shape is None:
+            return frozenset()
+        return rasterize_shape(shape, self.num_blocks_x, self.num_blocks_y)
 
-        for block_id, block in self.blocks.items():
-            is_target_high = block_id in target_group_ids
-            status_changed = block.set_highlight(is_target_high)
-            if status_changed and not block.is_high_brightness:
-                 block.redraw_dots(self.gui, self.config, force_brightness_range='low')
+    def _publish_highlight(self, target_group_ids):
+        """
+        Queues a new set of highlighted block IDs for the start of the next update_frame.
+
+        It is applied right away only when no run loop drives the display and the caller is
+        the thread calling update_frame (or no thread has called it yet).
+        """
+        with self._lock:
+            self._pending_highlight = target_group_ids
+        if self._loop_running:
+            return
+        render_thread = self._render_thread
+        if render_thread is None or render_thread == threading.get_ident():
+            self._apply_pending_highlight()
+
+    def _apply_pending_highlight(self):
+        """Swaps in the most recently published highlight set (render thread only)."""
+        with self._lock:
+            target_group_ids, self._pending_highlight = self._pending_highlight, None
+        if target_group_ids is not None:
+            self._apply_highlight(target_group_ids)
+
+    def _apply_highlight(self, target_group_ids):
+        """Highlights exactly target_group_ids, touching only blocks whose state changes."""
+        current = self._highlighted_ids
+        # Only blocks in the symmetric difference can change state
+        changed = current.symmetric_difference(target_group_ids)
+        self._apply_highlight_changes(changed.intersection(target_group_ids), changed.intersection(current))
+
+    def _apply_highlight_changes(self, turn_on, turn_off, fade_frames=None):
+        """
+        Updates block highlight flags, dot partitions and redraws for the given block IDs.
+
+        With fade_frames (default config["fade_frames"]) above zero, the dots of every changed
+        block ease toward a random level in their new range instead of switching at once.
+        """
+        if fade_frames is None:
+            fade_frames = self.config["fade_frames"]
+        config = self.config
+        blocks = self.blocks
+        fading = []
+        for block_ids, is_high in ((turn_on, True), (turn_off, False)):
+            for block_id in block_ids:
+                block = blocks.get(block_id)
+                if block is None or not block.set_highlight(is_high):
+                    continue
+                # Move this block's dots between the persistent partitions used by update_frame
+                source, target = self.low_brightness_dots, self.high_brightness_dots
+                if not is_high:
+                    source, target = target, source
+                for index in block.dot_indices:
+                    source.remove(index)
+                    target.add(index)
+                if self._engine is not None:
+                    self._engine.set_highlight(slice(block.dot_start, block.dot_end), is_high)
+                if fade_frames > 0:
+                    fading.append((block, is_high))
+                elif not is_high:
+                     errors = block.redraw_dots(self.gui, config, force_brightness_range='low', palette=self.palette,
+                                                rng=self.rng)
+                     if errors and self.stats:
+                         self.stats.backend_errors += errors
+                     if not isinstance(self.gui, CompositorGUI): # Composited dots only touch memory
+                         self._side_draw_calls += block.dot_end - block.dot_start
+                     if self._recorder is not None:
+                         self._recorded_ranges.append((block.dot_start, block.dot_end))
+                     if self._labels_covered_by_draws():
+                         block.raise_id(self.gui, config)
+                         self._side_draw_calls += 2 # remove + draw_text
+        if fading:
+            indices, targets = [], []
+            for block, is_high in fading:
+                lo, hi = ((config["high_brightness_min"], config["high_brightness_max"]) if is_high else
+                          (config["low_brightness_min"], config["low_brightness_max"]))
+                count = block.dot_end - block.dot_start
+                indices.extend(block.dot_indices)
+                if self._engine is not None:
+                    targets.extend(self._engine.rng.integers(lo, hi + 1, size=count).tolist())
+                else:
+                    targets.extend(self.rng.randint(lo, hi) for _ in range(count))
+            self._fader.start(indices, targets, fade_frames)
+        self._highlighted_ids.difference_update(turn_off)
+        self._highlighted_ids.update(turn_on)
+        self._side_draw_calls += self._flush_gui()
+
+    def _flush_gui(self):
+        """Pushes composited changes to the screen (no-op for GUIs that draw immediately). Returns the blit count."""
+        flush = getattr(self.gui, "flush", None)
+        if flush is None:
+            return 0
+        try:
+            blits = flush()
+        except Exception as e:
+            if self.stats:
+                self.stats.backend_errors += 1
+            print(f"Error flushing composited frame: {e}", file=sys.stderr, flush=True)
+            return 0
+        if getattr(self.gui, "created_images", 0):
+            # New tile images were stacked above the existing labels: put the labels back on top
+            for block in self.blocks.values():
+                if block.id_handle is not None:
+                    block.raise_id(self.gui, self.config)
+                    self._side_draw_calls += 2 # remove + draw_text
+        return blits
+
+    def start_recording(self, file, buffer_size=65536):
+        """
+        Starts recording everything the display shows to a compact binary stream.
+
+        The stream starts with the geometry, palette and current dot levels; after that
+        each update_frame appends the dots it drew plus any shape change. Replay it with
+        FramePlayer. Call from the render thread (or before the animation starts).
+
+        Args:
+            file: A path, or a binary file object opened for writing.
+            buffer_size (int, optional): Write buffer size when a path is given.
+
+        Returns:
+            FrameRecorder: The active recorder.
+        """
+        self.stop_recording()
+        recorder = FrameRecorder(file, buffer_size)
+        self._recorder = recorder
+        self._record_geometry()
+        recorder.write_palette(self.palette)
+        recorder.write_shape(self.selected_shape_name)
+        self._recorded_shape = self.selected_shape_name
+        store = self.dot_store
+        recorder.write_frame(time.perf_counter(), range(len(store)), store.level)
+        return recorder
+
+    def stop_recording(self):
+        """Stops recording and flushes (or closes) the stream."""
+        recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def _record_geometry(self):
+        """Writes the current dot coordinates, in screen coordinates, to the recording."""
+        store = self.dot_store
+        dx, dy = self.viewport[0] - self.origin_x, self.viewport[1] - self.origin_y # Compositor offset
+        xs = store.x if not dx else [x + dx for x in store.x]
+        ys = store.y if not dy else [y + dy for y in store.y]
+        self._recorder.write_geometry((self.screen_width, self.screen_height), self.viewport,
+                                      self.config["dot_size"], xs, ys)
+        self._recorded_ranges = []
+
+    def _record_frame(self, timestamp, dots_to_update):
+        """Appends this frame's drawn dots (and repainted blocks) to the recording."""
+        recorder = self._recorder
+        if self.selected_shape_name != self._recorded_shape:
+            self._recorded_shape = self.selected_shape_name
+            recorder.write_shape(self._recorded_shape)
+        if self._recorded_ranges:
+            drawn = set(dots_to_update)
+            for start, end in self._recorded_ranges:
+                drawn.update(range(start, end))
+            self._recorded_ranges = []
+            indices = sorted(drawn)
+        else:
+            indices = sorted(dots_to_update)
+        shown = self.dot_store.level
+        recorder.write_frame(timestamp, indices, bytes([shown[index] for index in indices]))
+
+    def export(self, file, count, fmt=None, loop=0):
+        """
+        Renders count frames and streams them to an animated GIF, animated PNG or raw RGB file.
+
+        The display must draw into a framebuffer (backend='framebuffer' or render_mode='composite').
+        Frames are spaced config["animation_interval"] apart and encoded one at a time.
+
+        Args:
+            file: A path or a binary file object ('-' writes to stdout in any format, e.g. for an ffmpeg pipe).
+            count (int): Number of frames.
+            fmt (str, optional): 'gif', 'apng' or 'raw'. Defaults to the file extension
+                                 ('.gif', '.png'/'.apng', anything else and '-' raw).
+            loop (int, optional): Repeats for GIF/APNG, 0 = forever.
+
+        Returns:
+            int: The number of frames written.
+
+        Raises:
+            ValueError: If the format is unknown or the display does not draw into a framebuffer
+                        (checked before the file is created).
+        """
+        name = file if isinstance(file, str) else getattr(file, "name", "")
+        if fmt is None:
+            extension = os.path.splitext(name)[1].lower() if isinstance(name, str) else ""
+            fmt = {'.gif': 'gif', '.png': 'apng', '.apng': 'apng'}.get(extension, 'raw')
+        if fmt not in ('gif', 'apng', 'raw'):
+            raise ValueError(f"Unknown export format: {fmt!r}")
+        framebuffer = getattr(self.gui, "framebuffer", None)
+        if framebuffer is None: # Checked before any file is created
+            raise ValueError("Exporting requires a framebuffer-backed display (e.g. backend='framebuffer')")
+        frames = iter_frames(self, count)
+        if file == '-': # Any format can be piped; stdout stays open afterwards
+            owns_file, f = False, sys.stdout.buffer
+        else:
+            owns_file = isinstance(file, (str, bytes, os.PathLike))
+            f = open(file, 'wb') if owns_file else file
+        try:
+            interval = self.config["animation_interval"]
+            if fmt == 'gif':
+                # Background and cleanup colors first, so a full custom palette cannot push them out of the table
+                colors = [self.config["bg_color"], 'black'] + list(self.palette)
+                return write_gif(frames, f, framebuffer.width, framebuffer.height, colors, interval, loop)
+            if fmt == 'apng':
+                return write_apng(frames, f, framebuffer.width, framebuffer.height, count, interval, loop)
+            return write_raw(frames, f)
+        finally:
+            if owns_file:
+                f.close()
+
+    def get_stats(self):
+        """
+        Returns frame statistics as a dict (None if config["collect_stats"] is off).
+
+        Includes achieved vs target FPS, frame-time p50/p95/p99, average time per phase
+        (highlight, select, brightness, color, draw, ids), backend draw calls per frame, error counts
+        and the adaptive update_scale.
+        """
+        if self.stats is None:
+            return None
+        summary = self.stats.summary(self.config["animation_interval"])
+        summary["update_scale"] = self.update_scale
+        return summary
+
+    @property
+    def update_scale(self):
+        """Factor currently applied to both update percentages (1.0 unless config["adaptive_update"] is on)."""
+        return self._rate_controller.scale if self.config["adaptive_update"] else 1.0
 
     def draw_ids(self):
-        """Draws all group IDs if enabled in config."""
-        if not self.config["show_ids"] or not self.gui:
+        """
+        Syncs the persistent group ID labels with config.
+
+        Labels are created once, recolored when id_color changes and removed when
+        show_ids is turned off, so at steady state this draws nothing.
+        """
+        if not self.gui:
             return
+        self._ids_key = (self.config["show_ids"], self.config["id_color"])
         for block in self.blocks.values():
-            block.draw_id(self.gui, self.config)
+            if self.config["show_ids"]:
+                block.draw_id(self.gui, self.config)
+            else:
+                block.remove_id(self.gui)
+
+    def _labels_covered_by_draws(self):
+        """True if drawing dots adds canvas items above the ID labels (immediate, non-composited drawing)."""
+        return (self.config["show_ids"] and not self.config["retained_mode"]
+                and not isinstance(self.gui, CompositorGUI))
 
     def update_frame(self):
         """
@@ -302,43 +2319,151 @@ class DotMatrixDisplay:
         if self.num_total_dots == 0 or not self.gui:
             return
 
-        high_brightness_dots = [dot for dot in self.all_dots if self.blocks[dot.group_id].is_high_brightness]
-        low_brightness_dots = [dot for dot in self.all_dots if not self.blocks[dot.group_id].is_high_brightness]
+        perf_counter = time.perf_counter
+        t_start = perf_counter()
+        self._render_thread = threading.get_ident()
+        if self._pending_highlight is not None:
+            self._apply_pending_highlight()
+        sequence = self._sequence
+        if sequence is not None:
+            for op in sequence.advance():
+                if op[0] == 'flip':
+                    self._apply_highlight_changes(*op[1:])
+                else: # 'shape'
+                    self.selected_shape_name = op[1]
+            if sequence.finished:
+                self._sequence = None
+        marquee = self._marquee
+        if marquee is not None:
+            mask = marquee.advance()
+            if mask is not None:
+                self._apply_highlight(mask)
+            elif marquee.finished:
+                self._marquee = None
+        if self._palette_key != (self.config["bg_color"], self.config["dot_color"], id(self.config.get("palette")),
+                                 self.config["brightness_levels"]):
+            self.rebuild_palette()
+        palette = self.palette
+        t_highlight = perf_counter()
 
+        # Partitions are maintained incrementally by set_target_shape
+        high_brightness_dots = self.high_brightness_dots.items
+        low_brightness_dots = self.low_brightness_dots.items
+        num_to_update_high = 0
+        num_to_update_low = 0
+        adaptive = self.config["adaptive_update"]
+        scale = self._rate_controller.scale if adaptive else 1.0
         if high_brightness_dots:
-            num_to_update_high = max(1, int(len(high_brightness_dots) * self.config["update_percentage_high"]))
-            dots_to_update = random.sample(high_brightness_dots, min(num_to_update_high, len(high_brightness_dots)))
-            for dot in dots_to_update:
-                parent_block = self.blocks[dot.group_id]
-                gray_level = parent_block.get_random_brightness(self.config)
-                hex_val = f'{gray_level:02x}'
-                dot_color = f'#{hex_val}{hex_val}{hex_val}'
-                try:
-                    self.gui.draw_rect(x=dot.x, y=dot.y, w=self.config['dot_size'], h=self.config['dot_size'],
-                                      fill=dot_color, outline=dot_color)
-                except Exception as e:
-                    print(f"Error updating high rect at ({dot.x},{dot.y}): {e}", file=sys.stderr, flush=True)
-
+            num_to_update_high = min(len(high_brightness_dots),
+                                     max(1, int(len(high_brightness_dots) * self.config["update_percentage_high"] * scale)))
         if low_brightness_dots:
-            num_to_update_low = max(1, int(len(low_brightness_dots) * self.config["update_percentage_low"]))
-            if num_to_update_low == 0 and self.config["update_percentage_low"] > 0: num_to_update_low = 1
-            dots_to_update = random.sample(low_brightness_dots, min(num_to_update_low, len(low_brightness_dots)))
-            for dot in dots_to_update:
-                parent_block = self.blocks[dot.group_id]
-                gray_level = parent_block.get_random_brightness(self.config)
-                hex_val = f'{gray_level:02x}'
-                dot_color = f'#{hex_val}{hex_val}{hex_val}'
-                try:
-                    self.gui.draw_rect(x=dot.x, y=dot.y, w=self.config['dot_size'], h=self.config['dot_size'],
-                                      fill=dot_color, outline=dot_color)
-                except Exception as e:
-                    print(f"Error updating low rect at ({dot.x},{dot.y}): {e}", file=sys.stderr, flush=True)
+            num_to_update_low = min(len(low_brightness_dots),
+                                    max(1, int(len(low_brightness_dots) * self.config["update_percentage_low"] * scale)))
 
-        self.draw_ids()
+        config = self.config
+        if self._engine is not None:
+            # The vectorized engine picks dots and levels in one draw, so it is all timed as 'select'
+            indices, levels = self._engine.select(num_to_update_high, num_to_update_low, config)
+            # Dots whose new level maps to the color already shown only need their level stored
+            codes = np.frombuffer(self.palette_codes, dtype=np.uint8)
+            shown = self._engine.levels
+            same = codes[levels] == codes[shown[indices]]
+            skipped = int(same.sum())
+            if skipped:
+                shown[indices[same]] = levels[same]
+                indices, levels = indices[~same], levels[~same]
+            dots_to_update = indices.tolist()
+            gray_levels = levels.tolist()
+            t_selected = t_levels = perf_counter()
+        else:
+            sample = self.rng.sample
+            dots_to_update = sample(high_brightness_dots, num_to_update_high)
+            dots_to_update += sample(low_brightness_dots, num_to_update_low)
+            t_selected = perf_counter()
+            randint = self.rng.randint
+            high_min, high_max = config["high_brightness_min"], config["high_brightness_max"]
+            low_min, low_max = config["low_brightness_min"], config["low_brightness_max"]
+            gray_levels = ([randint(high_min, high_max) for _ in range(num_to_update_high)] +
+                           [randint(low_min, low_max) for _ in range(num_to_update_low)])
+            # Dots whose new level maps to the color already shown only need their level stored
+            codes = self.palette_codes
+            shown = self.dot_store.level
+            changed = []
+            for index, gray_level in zip(dots_to_update, gray_levels):
+                if codes[gray_level] != codes[shown[index]]:
+                    changed.append((index, gray_level))
+                else:
+                    shown[index] = gray_level
+            skipped = len(dots_to_update) - len(changed)
+            dots_to_update = [index for index, _ in changed]
+            gray_levels = [gray_level for _, gray_level in changed]
+            t_levels = perf_counter()
+        fader = self._fader
+        if len(fader):
+            # Fading dots are driven by the fader alone until they reach their target
+            fading = fader.mask
+            kept = [(index, level) for index, level in zip(dots_to_update, gray_levels) if not fading[index]]
+            dots_to_update = [index for index, _ in kept]
+            gray_levels = [level for _, level in kept]
+            fade_indices, fade_levels = fader.step(self.palette_codes)
+            dots_to_update += fade_indices
+            gray_levels += fade_levels
+            t_levels = perf_counter()
+
+        colors = [palette[gray_level] for gray_level in gray_levels]
+        t_colors = perf_counter()
+
+        gui = self.gui
+        store = self.dot_store
+        paint = store.paint
+        current_levels = store.level
+        dot_size = config['dot_size']
+        errors = 0
+        for index, dot_color, gray_level in zip(dots_to_update, colors, gray_levels):
+            try:
+                paint(index, gui, dot_size, dot_color)
+                current_levels[index] = gray_level
+            except Exception as e:
+                errors += 1
+                print(f"Error updating rect at ({store.x[index]},{store.y[index]}): {e}", file=sys.stderr, flush=True)
+        if self._recorder is not None:
+            self._record_frame(t_start, dots_to_update)
+        composited = isinstance(gui, CompositorGUI)
+        draw_calls = 0 if composited else len(dots_to_update) # Composited dots only touch memory
+        draw_calls += self._flush_gui()
+        t_drawn = perf_counter()
+
+        # ID labels are persistent: only sync them when the settings change, and only
+        # re-raise the ones whose dots were just drawn as new items on top of them
+        if self._ids_key != (self.config["show_ids"], self.config["id_color"]):
+            self.draw_ids()
+        elif self._labels_covered_by_draws():
+            group = store.group
+            raised = {group[index] for index in dots_to_update}
+            for group_id in raised:
+                self.blocks[group_id].raise_id(gui, self.config)
+            draw_calls += 2 * len(raised) # remove + draw_text
+        t_end = perf_counter()
+        if adaptive:
+            config = self.config
+            self._rate_controller.update(t_end - t_start, config["animation_interval"] * config["adaptive_frame_budget"],
+                                         config["adaptive_scale_min"], config["adaptive_scale_max"])
+
+        # Highlight redraws since the last frame (including ones applied between frames) count towards this one
+        draw_calls += self._side_draw_calls
+        self._side_draw_calls = 0
+        stats = self.stats
+        if stats is not None:
+            stats.record_frame((t_start, t_highlight, t_selected, t_levels, t_colors, t_drawn, t_end),
+                               draw_calls, errors, skipped)
+            log_interval = self.config["stats_log_interval"]
+            if log_interval and t_end - stats.last_log_time >= log_interval:
+                stats.last_log_time = t_end
+                print(f"[DotMatrix] {stats.format_line(self.config['animation_interval'])}", flush=True)
 
     def run_continuous(self, initial_shape="circle"):
         """
-        Runs the main animation loop continuously using a non-blocking delay.
+        Runs the main animation loop continuously on a drift-free FrameScheduler.
 
         Args:
             initial_shape (str, optional): The name of the shape to display initially.
@@ -348,47 +2473,387 @@ class DotMatrixDisplay:
              print("Cannot run: GUI not initialized.", file=sys.stderr, flush=True)
              return
 
+        self._loop_running = True # From here on only update_frame applies highlight changes
         self.set_target_shape(initial_shape) # Set the initial shape
 
         print("Starting continuous animation... Press Ctrl+C to stop.")
 
         frame_counter = 0
         last_print_time = time.time()
-        last_update_time = time.monotonic()
+        scheduler = FrameScheduler(self.config["animation_interval"], policy=self.config["frame_policy"])
 
         try:
             while True:
-                current_monotonic_time = time.monotonic()
-                current_wall_time = time.time()
-
-                if current_monotonic_time - last_update_time >= self.config["animation_interval"]:
-                    self.update_frame()
-                    frame_counter += 1
-                    last_update_time = current_monotonic_time
+                scheduler.interval = self.config["animation_interval"] # Picks up runtime changes
+                scheduler.wait()
+                self.update_frame()
+                frame_counter += 1
 
+                current_wall_time = time.time()
                 if current_wall_time - last_print_time >= 1.0:
                     timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-                    print(f"\rFrame: {frame_counter} | Time: {timestamp} | Shape: {self.selected_shape_name}", end="", flush=True)
+                    print(f"\rFrame: {frame_counter} | Time: {timestamp} | Shape: {self.selected_shape_name} | Missed: {scheduler.missed_deadlines}", end="", flush=True)
                     last_print_time = current_wall_time
 
-                time.sleep(0.001)
-
         except KeyboardInterrupt:
             print("\nExiting animation loop (Ctrl+C detected).")
         finally:
             self.cleanup()
 
+    async def run_async(self, initial_shape="circle", stop_event=None):
+        """
+        Runs the animation loop as a coroutine on the current asyncio event loop.
+
+        Frames are paced on absolute deadlines like run_continuous, but the waits are
+        awaited, so other coroutines (which may call set_target_shape directly) keep
+        running on the same loop. Cancel the task, or set stop_event, to stop;
+        cleanup() runs either way.
+
+        Args:
+            initial_shape (str, optional): The name of the shape to display initially.
+                                           Defaults to "circle".
+            stop_event (asyncio.Event, optional): Ends the loop when set.
+        """
+        if not self.gui:
+             print("Cannot run: GUI not initialized.", file=sys.stderr, flush=True)
+             return
+
+        self._loop_running = True # From here on only update_frame applies highlight changes
+        self.set_target_shape(initial_shape) # Set the initial shape
+        scheduler = FrameScheduler(self.config["animation_interval"], policy=self.config["frame_policy"])
+        frame_counter = 0
+
+        try:
+            while stop_event is None or not stop_event.is_set():
+                scheduler.interval = self.config["animation_interval"] # Picks up runtime changes
+                delay = scheduler.time_until_next()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                scheduler.advance()
+                self.update_frame()
+                frame_counter += 1
+                self._resolve_frame_waiters(frame_counter)
+        finally:
+            self._cancel_frame_waiters()
+            self.cleanup()
+
+    async def wait_frame(self):
+        """
+        Waits until run_async (or DisplayGroup.run_async) has rendered this display's next frame.
+
+        Returns:
+            int: The number of frames the running loop has rendered for this display so far.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._frame_waiters.append(waiter)
+        return await waiter
+
+    def _resolve_frame_waiters(self, frame_counter):
+        """Wakes every wait_frame() caller with the loop's frame count."""
+        if self._frame_waiters:
+            waiters, self._frame_waiters = self._frame_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(frame_counter)
+
+    def _cancel_frame_waiters(self):
+        """Cancels pending wait_frame() calls when the async loop ends."""
+        for waiter in self._frame_waiters:
+            waiter.cancel()
+        self._frame_waiters = []
+
     def cleanup(self):
-        """Clears the screen on exit."""
+        """Clears the display's viewport (the whole screen by default) on exit and stops any recording."""
         print("Cleaning up...")
+        self.stop_recording()
+        self._loop_running = False
+        self._render_thread = None # Drawing may now happen from the calling thread
         if self.gui:
              try:
-                 self.gui.draw_rect(x=0, y=0, w=self.screen_width, h=self.screen_height, outline='black', fill='black')
+                 self.gui.draw_rect(x=self.origin_x, y=self.origin_y, w=self.viewport[2], h=self.viewport[3],
+                                    outline='black', fill='black')
+                 self._flush_gui()
                  print("Screen cleared.")
              except Exception as e:
                  print(f"Error clearing screen during cleanup: {e}", file=sys.stderr, flush=True)
         print("Exited.")
 
+# --- Multiple Displays ---
+
+class DisplayGroup:
+    """
+    Drives several DotMatrixDisplay viewports from one thread and one FrameScheduler.
+
+    Each tick updates every due display in one pass. The group ticks at the shortest
+    animation_interval of its displays (or the given interval); a display with a longer
+    interval is updated every round(its interval / group interval) ticks.
+    """
+    def __init__(self, displays=(), interval=None, policy='skip'):
+        self.displays = list(displays)
+        self.interval = interval # None: the shortest animation_interval of the displays
+        self.policy = policy
+        self.ticks = 0
+        self._running = False # A run loop is driving the displays
+
+    def add(self, display):
+        """Adds a display to the group."""
+        self.displays.append(display)
+        if self._running:
+            display._loop_running = True
+
+    def remove(self, display):
+        """Removes a display from the group (it is not cleaned up)."""
+        self.displays.remove(display)
+        display._loop_running = False
+
+    def _start_running(self):
+        """Marks every display as loop-driven, so highlight changes wait for its update_frame."""
+        self._running = True
+        for display in self.displays:
+            display._loop_running = True
+
+    def tick_interval(self):
+        """Seconds between ticks."""
+        if self.interval is not None:
+            return self.interval
+        return min((d.config["animation_interval"] for d in self.displays), default=DEFAULT_CONFIG["animation_interval"])
+
+    def update_frame(self):
+        """
+        Runs one tick: updates every display that is due.
+
+        Returns:
+            list: The displays updated during this tick.
+        """
+        interval = self.tick_interval()
+        ticks = self.ticks
+        updated = []
+        for display in self.displays:
+            every = max(1, round(display.config["animation_interval"] / interval))
+            if ticks % every == 0:
+                display.update_frame()
+                updated.append(display)
+        self.ticks = ticks + 1
+        return updated
+
+    def run_continuous(self, stop_event=None):
+        """
+        Runs all displays on one drift-free FrameScheduler until stop_event is set or Ctrl+C.
+
+        Args:
+            stop_event (threading.Event, optional): Ends the loop when set.
+        """
+        scheduler = FrameScheduler(self.tick_interval(), policy=self.policy, stop_event=stop_event)
+        self._start_running()
+        try:
+            while True:
+                scheduler.interval = self.tick_interval() # Picks up runtime changes
+                if not scheduler.wait():
+                    break
+                self.update_frame()
+        except KeyboardInterrupt:
+            print("\nExiting animation loop (Ctrl+C detected).")
+        finally:
+            self.cleanup()
+
+    async def run_async(self, stop_event=None):
+        """
+        Runs all displays as one coroutine on the current asyncio event loop.
+
+        A display's wait_frame() resolves after each tick that updated it. Cancel the task, or set stop_event, to stop; cleanup() runs either way.
+
+        Args:
+            stop_event (asyncio.Event, optional): Ends the loop when set.
+        """
+        scheduler = FrameScheduler(self.tick_interval(), policy=self.policy)
+        self._start_running()
+        frame_counts = {} # id(display) -> frames rendered by this loop, reported to wait_frame()
+        try:
+            while stop_event is None or not stop_event.is_set():
+                scheduler.interval = self.tick_interval()
+                delay = scheduler.time_until_next()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                scheduler.advance()
+                for display in self.update_frame():
+                    frame_counts[id(display)] = frame_counts.get(id(display), 0) + 1
+                    display._resolve_frame_waiters(frame_counts[id(display)])
+        finally:
+            for display in self.displays:
+                display._cancel_frame_waiters()
+            self.cleanup()
+
+    def cleanup(self):
+        """Clears every display's viewport."""
+        self._running = False
+        for display in self.displays:
+            display.cleanup()
+
+# --- Export ---
+# Writers take any iterable of RGB frames (bytes, row-major, 3 bytes per pixel), so frames are
+# encoded as they are rendered and a long export never holds more than one frame in memory.
+
+def iter_frames(display, count):
+    """
+    Runs update_frame count times and yields a copy of the framebuffer after each frame.
+
+    Args:
+        display (DotMatrixDisplay): A display drawing into a framebuffer (backend='framebuffer',
+                                    a FramebufferGUI, or render_mode='composite').
+        count (int): Number of frames.
+
+    Raises:
+        ValueError: If the display does not draw into a framebuffer (when iteration starts,
+                    as this is a generator).
+    """
+    framebuffer = getattr(display.gui, "framebuffer", None)
+    if framebuffer is None:
+        raise ValueError("Exporting requires a framebuffer-backed display (e.g. backend='framebuffer')")
+    for _ in range(count):
+        display.update_frame()
+        yield bytes(framebuffer.pixels)
+
+def write_raw(frames, file):
+    """Writes frames back to back as raw RGB24 (e.g. to an ffmpeg pipe). Returns the frame count."""
+    count = 0
+    for frame in frames:
+        file.write(frame)
+        count += 1
+    file.flush()
+    return count
+
+def write_apng(frames, file, width, height, num_frames, interval, loop=0):
+    """
+    Writes frames as an animated PNG (pure Python).
+
+    Args:
+        frames: Iterable of RGB frames.
+        file: Binary file object.
+        width (int), height (int): Frame size in pixels.
+        num_frames (int): Number of frames the iterable yields (stored up front in the acTL chunk).
+        interval (float): Seconds per frame.
+        loop (int, optional): Number of plays, 0 = forever.
+
+    Returns:
+        int: The number of frames written.
+    """
+    file.write(_PNG_SIGNATURE)
+    file.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+    file.write(_png_chunk(b'acTL', struct.pack('>II', num_frames, loop)))
+    delay_ms = min(0xFFFF, max(0, round(interval * 1000)))
+    sequence = 0
+    count = 0
+    for frame in frames:
+        if count == num_frames:
+            break
+        file.write(_png_chunk(b'fcTL', struct.pack('>IIIIIHHBB', sequence, width, height, 0, 0, delay_ms, 1000, 0, 0)))
+        sequence += 1
+        data = zlib.compress(_png_scanlines(frame, width, height))
+        if count == 0:
+            file.write(_png_chunk(b'IDAT', data)) # The first frame doubles as the static image
+        else:
+            file.write(_png_chunk(b'fdAT', struct.pack('>I', sequence) + data))
+            sequence += 1
+        count += 1
+    file.write(_png_chunk(b'IEND', b''))
+    file.flush()
+    return count
+
+class _ColorIndex(dict):
+    """Maps 3-byte RGB values to color table slots, falling back to the nearest table color."""
+    def __init__(self, table):
+        super().__init__((rgb, i) for i, rgb in enumerate(table))
+        self.table = table
+
+    def __missing__(self, rgb):
+        slot = min(range(len(self.table)), key=lambda i: sum((a - b) ** 2 for a, b in zip(self.table[i], rgb)))
+        self[rgb] = slot
+        return slot
+
+def _lzw_encode(indices, min_code_size=8):
+    """GIF-flavoured LZW: variable-width codes (up to 12 bits), packed LSB first."""
+    clear_code = 1 << min_code_size
+    first_free = clear_code + 2
+    out = bytearray()
+    bits = 0 # Bit accumulator
+    bit_count = 0
+    code_size = min_code_size + 1
+    table = {} # (prefix code << 8 | next index) -> code
+    next_code = first_free
+
+    def emit(code, size):
+        nonlocal bits, bit_count
+        bits |= code << bit_count
+        bit_count += size
+        while bit_count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            bit_count -= 8
+
+    emit(clear_code, code_size)
+    prefix = indices[0]
+    for index in indices[1:]:
+        key = prefix << 8 | index
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix, code_size)
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else: # Table full: start over
+            emit(clear_code, code_size)
+            table.clear()
+            next_code = first_free
+            code_size = min_code_size + 1
+        prefix = index
+    emit(prefix, code_size)
+    emit(clear_code + 1, code_size) # End of information
+    if bit_count:
+        out.append(bits & 0xFF)
+    return bytes(out)
+
+def write_gif(frames, file, width, height, colors, interval, loop=0):
+    """
+    Writes frames as an animated GIF (pure Python LZW).
+
+    Args:
+        frames: Iterable of RGB frames.
+        file: Binary file object.
+        width (int), height (int): Frame size in pixels.
+        colors (list): Color strings for the global color table (the display palette), most important
+                       first; duplicates are merged, the first 256 distinct colors are used and other
+                       pixels map to the nearest one.
+        interval (float): Seconds per frame (stored in 1/100 s).
+        loop (int, optional): Number of repeats, 0 = forever.
+
+    Returns:
+        int: The number of frames written.
+    """
+    table = list(dict.fromkeys(_color_bytes(color) for color in colors))[:256]
+    color_index = _ColorIndex(table)
+    file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF7, 0, 0))
+    file.write(b''.join(table) + b'\x00\x00\x00' * (256 - len(table)))
+    file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01' + struct.pack('<H', loop) + b'\x00')
+    delay = min(0xFFFF, max(0, round(interval * 100)))
+    count = 0
+    for frame in frames:
+        indices = bytes([color_index[frame[i:i + 3]] for i in range(0, len(frame), 3)])
+        file.write(b'\x21\xF9\x04\x00' + struct.pack('<H', delay) + b'\x00\x00') # Graphic control extension
+        file.write(b'\x2C' + struct.pack('<HHHHB', 0, 0, width, height, 0) + b'\x08')
+        data = _lzw_encode(indices)
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            file.write(bytes((len(block),)) + block)
+        file.write(b'\x00')
+        count += 1
+    file.write(b'\x3B')
+    file.flush()
+    return count
+
 # --- Example Usage (if run directly) ---
 # This block is now intended only for testing the library itself.
 # To use the library, import DotMatrixDisplay and instantiate it in another script.